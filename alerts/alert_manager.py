@@ -1,18 +1,90 @@
-import smtplib
+import threading
+import atexit
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+import time
+import html
+from string import Template
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import logging
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
+from alerts.smtp_pool import PooledSMTP
+
+# Maximum number of alerts waiting to be delivered
+ALERT_QUEUE_SIZE = 10_000
+
+# Number of most recent alerts kept in memory
+ALERT_HISTORY_SIZE = 10_000
+
+# Queued by close() to make the flusher send what it holds and exit
+STOP_FLUSHER = object()
+
+SEVERITY_RANK = {"info": 0, "warning": 1, "critical": 2}
+
+# HTML email templates, parsed once at import
+EMAIL_ROW_TEMPLATE = Template("""
+              <tr>
+                <td>$alert_id</td>
+                <td style="color: red">$severity</td>
+                <td>$timestamp</td>
+                <td>$sensor_id</td>
+                <td>$temperature°C</td>
+                <td>$pressure hPa</td>
+                <td>$anomaly_score</td>
+              </tr>""")
+
+EMAIL_TEMPLATE = Template("""
+        <html>
+          <body>
+            <h2>🚨 Anomaly Alert</h2>
+            <p><strong>Alerts:</strong> $count</p>
+            <hr>
+            <h3>Sensor Data:</h3>
+            <table border="1" cellpadding="5">
+              <tr>
+                <th>Alert ID</th><th>Severity</th><th>Time</th><th>Sensor ID</th>
+                <th>Temperature</th><th>Pressure</th><th>Anomaly Score</th>
+              </tr>$rows
+            </table>
+            <hr>
+            <p><em>This is an automated alert from AnomaLens</em></p>
+          </body>
+        </html>
+        """)
 
 class AlertManager:
     def __init__(self, config_path="config/alerts_config.json"):
         self.config = self.load_config(config_path)
         self.logger = self.setup_logger()
-        self.alert_history = []
+        self.alert_history = deque(maxlen=ALERT_HISTORY_SIZE)
+        
+        # Long-lived SMTP session shared across alerts
+        self._smtp = PooledSMTP(self.config['email'])
+        
+        # Date prefix for alert IDs, reformatted at most once per second
+        self._date_prefix = ""
+        self._date_prefix_expires = 0.0
+        
+        # Keep-alive HTTP session so webhook posts reuse TCP/TLS connections
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
         
+        # Alerts are queued by send_alert and delivered in batches by a background flusher
+        self._queue = queue.Queue(maxsize=ALERT_QUEUE_SIZE)
+        self._flusher = None
+        self._flusher_lock = threading.Lock()
+        
+        # Enabled delivery channels, resolved once from config and sent to concurrently
+        self._channels = self.build_channels()
+        self._channel_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="alert-channel")
+        atexit.register(self.close)
+    
     def load_config(self, config_path):
         """Load alert configuration"""
         config = {
@@ -23,7 +95,8 @@ class AlertManager:
                 "sender": "alerts@anomalens.com",
                 "recipients": ["admin@example.com"],
                 "username": None,
-                "password": None
+                "password": None,
+                "max_messages_per_connection": 100
             },
             "slack": {
                 "enabled": False,
@@ -33,6 +106,10 @@ class AlertManager:
                 "enabled": False,
                 "webhook_url": None
             },
+            "batching": {
+                "max_batch_size": 100,
+                "batch_duration_seconds": 2.0
+            },
             "thresholds": {
                 "critical": 0.9,
                 "warning": 0.7,
@@ -41,9 +118,22 @@ class AlertManager:
         }
         return config
     
+    def build_channels(self):
+        """Bind the send method of every enabled channel"""
+        channels = [
+            ("email", self.send_email_alert),
+            ("slack", self.send_slack_alert),
+            ("teams", self.send_teams_alert)
+        ]
+        return [send for name, send in channels if self.config[name]["enabled"]]
+    
+    def setup_logger(self):
+        """Get the alert manager logger"""
+        return logging.getLogger(__name__)
+    
     def send_alert(self, anomaly_data: Dict, severity: str = "warning"):
-        """Send alert through all configured channels"""
-        alert_id = f"alert_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        """Queue alert for delivery through all configured channels"""
+        alert_id = self._next_alert_id()
         
         alert_message = {
             "alert_id": alert_id,
@@ -56,59 +146,191 @@ class AlertManager:
         # Store in history
         self.alert_history.append(alert_message)
         
-        # Send via email
-        if self.config["email"]["enabled"]:
-            self.send_email_alert(alert_message)
+        # Hand off to the background flusher so detection never waits on SMTP/HTTP
+        self._ensure_flusher()
+        try:
+            self._queue.put_nowait(alert_message)
+        except queue.Full:
+            self.logger.error("Alert queue full, dropping alert: %s", alert_id)
+            return alert_id
         
-        # Send via Slack
-        if self.config["slack"]["enabled"]:
-            self.send_slack_alert(alert_message)
+        self.logger.info("Alert queued: %s - %s", alert_id, severity)
+        return alert_id
+    
+    def _next_alert_id(self) -> str:
+        """Build a unique alert ID from the cached date and a monotonic counter"""
+        now = time.time()
+        if now >= self._date_prefix_expires:
+            self._date_prefix = time.strftime('%Y%m%d_', time.localtime(now))
+            self._date_prefix_expires = now + 1
+        return f"alert_{self._date_prefix}{time.monotonic_ns()}"
+    
+    def _ensure_flusher(self):
+        """Start the background flusher thread if it is not running"""
+        with self._flusher_lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name="alert-flusher", daemon=True)
+                self._flusher.start()
+    
+    def _flush_loop(self):
+        """Deliver queued alerts in batches until close() stops the flusher"""
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                self.logger.error("Failed to dispatch alert batch: %s", e)
+    
+    def _next_batch(self):
+        """Block for one alert, then collect more until the batch window closes or the batch is full; also report a stop request"""
+        max_size = self.config["batching"]["max_batch_size"]
         
-        # Send via Teams
-        if self.config["teams"]["enabled"]:
-            self.send_teams_alert(alert_message)
+        alert = self._queue.get()
+        if alert is STOP_FLUSHER:
+            return [], True
+        batch = [alert]
+        deadline = time.monotonic() + self.config["batching"]["batch_duration_seconds"]
+        while len(batch) < max_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                alert = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if alert is STOP_FLUSHER:
+                return batch, True
+            batch.append(alert)
+        return batch, False
+    
+    def _dispatch(self, alerts: List[Dict]):
+        """Send a batch of alerts through all configured channels"""
+        # SMTP and webhook posts are independent, so fire them concurrently
+        futures = []
+        for send in self._channels:
+            try:
+                futures.append(self._channel_pool.submit(send, alerts))
+            except RuntimeError:
+                # The executor refuses new work during interpreter shutdown, so send inline
+                send(alerts)
+        wait(futures)
+        for future in futures:
+            if future.exception() is not None:
+                self.logger.error("Alert channel failed: %s", future.exception())
         
-        self.logger.info(f"Alert sent: {alert_id} - {severity}")
-        return alert_id
+        self.logger.info("Alert batch sent: %d alerts", len(alerts))
     
-    def send_email_alert(self, alert_message: Dict):
-        """Send email alert"""
+    def send_email_alert(self, alerts: List[Dict], recipients: Optional[List[str]] = None):
+        """Send one email for a batch of alerts to each recipient over a single SMTP session"""
+        if recipients is None:
+            recipients = self.config['email']['recipients']
+        sender = self.config['email']['sender']
+        
+        severity = max((a['severity'] for a in alerts), key=lambda s: SEVERITY_RANK.get(s, 0))
+        
         msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"[{alert_message['severity'].upper()}] Anomaly Alert"
-        msg['From'] = self.config['email']['sender']
-        msg['To'] = ', '.join(self.config['email']['recipients'])
+        if len(alerts) == 1:
+            msg['Subject'] = f"[{severity.upper()}] Anomaly Alert"
+        else:
+            msg['Subject'] = f"[{severity.upper()}] {len(alerts)} Anomaly Alerts"
+        msg['From'] = sender
+        msg['To'] = ', '.join(recipients)
+        
+        # Escape every field so sensor-supplied values can't inject HTML
+        rows = "".join(
+            EMAIL_ROW_TEMPLATE.substitute(
+                alert_id=html.escape(str(alert['alert_id'])),
+                severity=html.escape(alert['severity'].upper()),
+                timestamp=html.escape(str(alert['timestamp'])),
+                sensor_id=html.escape(str(alert['data'].get('sensor_id', 'N/A'))),
+                temperature=html.escape(str(alert['data'].get('temperature', 'N/A'))),
+                pressure=html.escape(str(alert['data'].get('pressure', 'N/A'))),
+                anomaly_score=html.escape(str(alert['data'].get('anomaly_score', 'N/A')))
+            )
+            for alert in alerts
+        )
         
         # HTML email content
-        html = f"""
-        <html>
-          <body>
-            <h2>🚨 Anomaly Alert</h2>
-            <p><strong>Alert ID:</strong> {alert_message['alert_id']}</p>
-            <p><strong>Severity:</strong> <span style="color: red">{alert_message['severity'].upper()}</span></p>
-            <p><strong>Time:</strong> {alert_message['timestamp']}</p>
-            <hr>
-            <h3>Sensor Data:</h3>
-            <table border="1" cellpadding="5">
-              <tr><th>Sensor ID</th><td>{alert_message['data'].get('sensor_id', 'N/A')}</td></tr>
-              <tr><th>Temperature</th><td>{alert_message['data'].get('temperature', 'N/A')}°C</td></tr>
-              <tr><th>Pressure</th><td>{alert_message['data'].get('pressure', 'N/A')} hPa</td></tr>
-              <tr><th>Anomaly Score</th><td>{alert_message['data'].get('anomaly_score', 'N/A')}</td></tr>
-            </table>
-            <hr>
-            <p><em>This is an automated alert from AnomaLens</em></p>
-          </body>
-        </html>
-        """
+        body = EMAIL_TEMPLATE.substitute(count=len(alerts), rows=rows)
+        
+        msg.attach(MIMEText(body, 'html'))
         
-        msg.attach(MIMEText(html, 'html'))
+        # MIME-encode once and reuse the payload for every recipient
+        payload = msg.as_string()
+        
+        try:
+            self._smtp.sendmail(sender, recipients, payload)
+        except Exception as e:
+            self.logger.error("Failed to send email alert: %s", e)
+    
+    def send_slack_alert(self, alerts: List[Dict]):
+        """Send one Slack message summarizing a batch of alerts"""
+        lines = "\n".join(
+            f"*{alert['severity'].upper()}* `{alert['data'].get('sensor_id', 'N/A')}` "
+            f"score={alert['data'].get('anomaly_score', 'N/A')} ({alert['timestamp']})"
+            for alert in alerts
+        )
+        message = {
+            "blocks": [
+                {
+                    "type": "header",
+                    "text": {
+                        "type": "plain_text",
+                        "text": f"🚨 {len(alerts)} Anomaly Alert(s)"
+                    }
+                },
+                {
+                    "type": "section",
+                    "text": {"type": "mrkdwn", "text": lines}
+                }
+            ]
+        }
         
         try:
-            server = smtplib.SMTP(self.config['email']['smtp_server'], 
-                                 self.config['email']['smtp_port'])
-            server.starttls()
-            server.login(self.config['email']['username'], 
-                        self.config['email']['password'])
-            server.send_message(msg)
-            server.quit()
+            self._session.post(self.config['slack']['webhook_url'], json=message, timeout=5)
         except Exception as e:
-            self.logger.error(f"Failed to send email alert: {e}")
\ No newline at end of file
+            self.logger.error("Failed to send Slack alert: %s", e)
+    
+    def send_teams_alert(self, alerts: List[Dict]):
+        """Send one Teams message summarizing a batch of alerts"""
+        lines = "\n\n".join(
+            f"**{alert['severity'].upper()}** {alert['data'].get('sensor_id', 'N/A')} "
+            f"score={alert['data'].get('anomaly_score', 'N/A')} ({alert['timestamp']})"
+            for alert in alerts
+        )
+        message = {
+            "title": f"🚨 {len(alerts)} Anomaly Alert(s)",
+            "text": lines
+        }
+        
+        try:
+            self._session.post(self.config['teams']['webhook_url'], json=message, timeout=5)
+        except Exception as e:
+            self.logger.error("Failed to send Teams alert: %s", e)
+    
+    def close(self):
+        """Deliver any queued alerts and release the pooled SMTP session and HTTP connections"""
+        # Let the flusher send the batch it is holding plus everything queued before the stop
+        with self._flusher_lock:
+            flusher = self._flusher
+        if flusher is not None and flusher.is_alive():
+            self._queue.put(STOP_FLUSHER)
+            flusher.join()
+        
+        pending = []
+        while True:
+            try:
+                alert = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if alert is not STOP_FLUSHER:
+                pending.append(alert)
+        if pending:
+            self._dispatch(pending)
+        self._channel_pool.shutdown(wait=True)
+        
+        self._smtp.close()
+        self._session.close()
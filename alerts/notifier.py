@@ -1,13 +1,33 @@
-import smtplib
+import atexit
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import orjson
+from alerts.smtp_pool import PooledSMTP
+
+# Static Slack header block, shared by every alert message
+SLACK_HEADER_BLOCK = {
+    "type": "header",
+    "text": {
+        "type": "plain_text",
+        "text": "🚨 Anomaly Detected!"
+    }
+}
 
 class AlertSystem:
     def __init__(self, config):
         self.config = config
         
+        # Long-lived SMTP session shared across alerts
+        self._smtp = PooledSMTP(self.config.get('email', {}))
+        atexit.register(self.close)
+        
+        # Keep-alive HTTP session so webhook posts reuse TCP/TLS connections
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        
     def send_email_alert(self, anomaly_data):
         msg = MIMEMultipart()
         msg['From'] = self.config['email']['sender']
@@ -27,25 +47,20 @@ class AlertSystem:
         
         msg.attach(MIMEText(body, 'plain'))
         
-        with smtplib.SMTP(self.config['email']['smtp_server'], 
-                         self.config['email']['smtp_port']) as server:
-            server.starttls()
-            server.login(self.config['email']['username'], 
-                        self.config['email']['password'])
-            server.send_message(msg)
+        self._smtp.send_message(msg)
+    
+    def close(self):
+        """Release the pooled SMTP session and HTTP connections"""
+        self._smtp.close()
+        self._session.close()
     
     def send_slack_alert(self, anomaly_data):
         webhook_url = self.config['slack']['webhook_url']
         
+        # Only the section fields vary per alert
         message = {
             "blocks": [
-                {
-                    "type": "header",
-                    "text": {
-                        "type": "plain_text",
-                        "text": "🚨 Anomaly Detected!"
-                    }
-                },
+                SLACK_HEADER_BLOCK,
                 {
                     "type": "section",
                     "fields": [
@@ -56,4 +71,5 @@ class AlertSystem:
             ]
         }
         
-        requests.post(webhook_url, json=message)
\ No newline at end of file
+        self._session.post(webhook_url, data=orjson.dumps(message),
+                           headers={'Content-Type': 'application/json'}, timeout=5)
\ No newline at end of file
@@ -0,0 +1,93 @@
+import smtplib
+import threading
+from contextlib import contextmanager
+
+# Messages sent over one SMTP session before it is recycled, unless configured
+DEFAULT_MAX_MESSAGES_PER_CONNECTION = 100
+
+class PooledSMTP:
+    """Long-lived SMTP session shared across alerts, health-checked and recycled"""
+    
+    def __init__(self, email_config):
+        self.config = email_config
+        self.max_messages = email_config.get('max_messages_per_connection', DEFAULT_MAX_MESSAGES_PER_CONNECTION)
+        self._smtp = None
+        self._lock = threading.Lock()
+        self._sent = 0
+    
+    def sendmail(self, sender, recipients, payload):
+        """Send an encoded message to each recipient separately over one session"""
+        refused = {}
+        with self._session() as server:
+            for rcpt in recipients:
+                # A rejected recipient must not stop delivery to the rest
+                try:
+                    server.sendmail(sender, [rcpt], payload)
+                except smtplib.SMTPRecipientsRefused as e:
+                    refused.update(e.recipients)
+                except smtplib.SMTPResponseException as e:
+                    refused[rcpt] = (e.smtp_code, e.smtp_error)
+                self._sent += 1
+        if refused:
+            raise smtplib.SMTPRecipientsRefused(refused)
+    
+    def send_message(self, msg):
+        """Send an email.message.Message"""
+        with self._session() as server:
+            server.send_message(msg)
+            self._sent += 1
+    
+    def close(self):
+        """Close the current SMTP session"""
+        with self._lock:
+            self._quit()
+    
+    @contextmanager
+    def _session(self):
+        """Yield a connected session with the lock held, dropping it on connection errors"""
+        with self._lock:
+            server = self._connect()
+            try:
+                yield server
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # Drop the broken session so the next alert reconnects
+                self._smtp = None
+                raise
+    
+    def _connect(self):
+        """Return a connected SMTP session, reconnecting if needed (call with _lock held)"""
+        # Recycle the session after a fixed number of messages
+        if self._smtp is not None and self._sent >= self.max_messages:
+            self._quit()
+        
+        # Health check the existing session
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPServerDisconnected, OSError):
+                pass
+            self._smtp = None
+        
+        server = smtplib.SMTP(self.config['smtp_server'],
+                              self.config['smtp_port'])
+        try:
+            server.starttls()
+            server.login(self.config['username'],
+                         self.config['password'])
+        except Exception:
+            # Don't leak the socket when the handshake fails
+            server.close()
+            raise
+        self._smtp = server
+        self._sent = 0
+        return server
+    
+    def _quit(self):
+        """Close the current SMTP session (call with _lock held)"""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
@@ -1,6 +1,7 @@
 import numpy as np
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
+import tensorflow as tf
 from tensorflow.keras.models import Model, Sequential
 from tensorflow.keras.layers import LSTM, Dense, RepeatVector, TimeDistributed
 from tensorflow.keras.callbacks import EarlyStopping
@@ -10,7 +11,8 @@ class IsolationForestDetector:
         self.model = IsolationForest(
             contamination=contamination,
             random_state=42,
-            n_estimators=100
+            n_estimators=100,
+            n_jobs=-1
         )
         self.scaler = StandardScaler()
         
@@ -27,6 +29,7 @@ class LSTMAutoencoder:
         self.timesteps = timesteps
         self.n_features = n_features
         self.model = self.build_model()
+        self.interpreter = None
         
     def build_model(self):
         model = Sequential([
@@ -43,9 +46,35 @@ class LSTMAutoencoder:
         model.compile(optimizer='adam', loss='mse')
         return model
     
+    def quantize(self):
+        """Convert the trained model to a TFLite interpreter with int8 dynamic-range quantized weights"""
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        self.interpreter = tf.lite.Interpreter(model_content=converter.convert())
+        self._input_index = self.interpreter.get_input_details()[0]['index']
+        self._output_index = self.interpreter.get_output_details()[0]['index']
+        self._batch_size = None
+    
+    def _predict_quantized(self, data):
+        """Run the quantized interpreter, resizing its input only when the batch size changes"""
+        if data.shape[0] != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input_index, data.shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = data.shape[0]
+        self.interpreter.set_tensor(self._input_index, data)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output_index)
+    
     def detect_anomalies(self, data, threshold_quantile=0.95):
-        predictions = self.model.predict(data)
-        mse = np.mean(np.power(data - predictions, 2), axis=1)
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        if self.interpreter is not None:
+            predictions = self._predict_quantized(data)
+        else:
+            predictions = np.asarray(self.model.predict(data), dtype=np.float32)
+        
+        # Per-sequence reconstruction error; the difference overwrites the prediction buffer
+        diff = np.subtract(data, predictions, out=predictions)
+        mse = np.einsum('ntf,ntf->n', diff, diff) / (diff.shape[1] * diff.shape[2])
         threshold = np.quantile(mse, threshold_quantile)
         anomalies = mse > threshold
         return anomalies, mse, threshold
\ No newline at end of file
@@ -1,8 +1,8 @@
 """
 API endpoints/routes
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, File, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, File, UploadFile, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import pandas as pd
 import numpy as np
 import io
@@ -10,11 +10,14 @@ import json
 from datetime import datetime, timedelta
 from typing import List, Optional
 import asyncio
-import tempfile
-import os
+import codecs
+import logging
+from collections import defaultdict, deque
+from itertools import count, islice, takewhile
+from charset_normalizer import from_bytes
 
 from api.models import (
-    SensorData, BatchSensorData, PredictionResponse, 
+    SensorData, BatchSensorData, PredictionResponse,
     BatchPredictionResponse, ModelInfo, TrainingRequest,
     TrainingResponse, AnomalyAlert
 )
@@ -22,9 +25,170 @@ from core.anomaly_detector import detector
 from core.config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Columns an uploaded CSV must provide
+REQUIRED_COLUMNS = ['sensor_id', 'temperature', 'pressure', 'humidity', 'vibration']
+
+# Column types applied while parsing uploaded CSVs
+CSV_DTYPES = {
+    'sensor_id': str,
+    'temperature': float,
+    'pressure': float,
+    'humidity': float,
+    'vibration': float
+}
+
+# Rows per parsed CSV chunk (the BatchSensorData limit, so each chunk validates as one batch)
+CSV_CHUNK_SIZE = 1000
+
+# Bytes of an upload inspected to detect its encoding
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+# Training jobs allowed to wait behind the one currently running
+TRAINING_QUEUE_SIZE = 4
+
+def _detect_encoding(head: bytes) -> Optional[str]:
+    """Detect the encoding of an upload from its first bytes"""
+    try:
+        # Incremental decode tolerates a multi-byte character cut at the end of the sample
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        match = from_bytes(head).best()
+        return match.encoding if match else None
+
+# Maximum number of alerts kept in memory (per index)
+ALERT_HISTORY_SIZE = 10_000
+
+def init_alert_store(state):
+    """Create the in-memory alert indexes on the application state"""
+    state.alerts = deque(maxlen=ALERT_HISTORY_SIZE)
+    state.alerts_by_sensor = defaultdict(lambda: deque(maxlen=ALERT_HISTORY_SIZE))
+    state.alerts_by_severity = defaultdict(lambda: deque(maxlen=ALERT_HISTORY_SIZE))
+
+def record_alert(state, alert: AnomalyAlert):
+    """Index a new alert; alerts must be recorded in time order"""
+    state.alerts.append(alert)
+    state.alerts_by_sensor[alert.sensor_id].append(alert)
+    state.alerts_by_severity[alert.severity.value].append(alert)
+
+# Sequence number that keeps alert IDs raised within the same second unique
+ALERT_SEQUENCE = count()
+
+def record_prediction_alerts(state, readings: List[SensorData], predictions: List[PredictionResponse]):
+    """Record an alert for every anomalous prediction, stamped with the time it was raised"""
+    now = datetime.now()
+    for reading, prediction in zip(readings, predictions):
+        if prediction.is_anomaly:
+            record_alert(state, AnomalyAlert(
+                alert_id=f"alert_{now.strftime('%Y%m%d_%H%M%S')}_{next(ALERT_SEQUENCE)}",
+                timestamp=now,
+                sensor_id=reading.sensor_id,
+                severity=prediction.severity,
+                anomaly_score=prediction.anomaly_score,
+                data=reading
+            ))
+
+def seed_mock_alerts(state, n_alerts: int = 50):
+    """Record demo alerts, one every 10 minutes up to now"""
+    # In production, alerts would be recorded as they are raised
+    rng = np.random.default_rng()
+    temperatures = (20 + rng.normal(0, 5, n_alerts)).tolist()
+    pressures = (1013 + rng.normal(0, 20, n_alerts)).tolist()
+    humidities = (50 + rng.normal(0, 10, n_alerts)).tolist()
+    vibrations = rng.uniform(0, 2, n_alerts).tolist()
+    
+    base = datetime.now()
+    for i in reversed(range(n_alerts)):
+        alert_time = base - timedelta(minutes=i*10)
+        record_alert(state, AnomalyAlert(
+            alert_id=f"alert_{alert_time.strftime('%Y%m%d_%H%M%S')}_{i}",
+            timestamp=alert_time,
+            sensor_id=f"sensor_{(i % 10):03d}",
+            severity="critical" if i % 5 == 0 else "warning",
+            anomaly_score=0.7 + (i * 0.01) % 0.3,
+            data=SensorData(
+                sensor_id=f"sensor_{(i % 10):03d}",
+                temperature=temperatures[i],
+                pressure=pressures[i],
+                humidity=humidities[i],
+                vibration=vibrations[i]
+            ),
+            acknowledged=i % 3 == 0,
+            acknowledged_by="admin" if i % 3 == 0 else None,
+            acknowledged_at=alert_time + timedelta(minutes=5) if i % 3 == 0 else None
+        ))
+
+def init_training_queue(state):
+    """Create the training job queue and start its single consumer"""
+    state.training_queue = asyncio.Queue(maxsize=TRAINING_QUEUE_SIZE)
+    state.training_task = asyncio.create_task(_training_worker(state.training_queue))
+
+async def _training_worker(training_queue: asyncio.Queue):
+    """Run queued training jobs one at a time so two fits never race on the detector"""
+    while True:
+        job_id, n_samples, contamination, algorithm = await training_queue.get()
+        try:
+            await asyncio.to_thread(detector.train_new_model_sync, n_samples, contamination, algorithm)
+            logger.info("Training job %s finished", job_id)
+        except Exception as e:
+            logger.error("Training job %s failed: %s", job_id, e)
+        finally:
+            training_queue.task_done()
+
+async def _score_chunk(chunk: pd.DataFrame, request: Request) -> pd.DataFrame:
+    """Validate and score one parsed CSV chunk, returning its prediction rows"""
+    # Validate required columns
+    missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Missing required columns: {missing}"
+        )
+    
+    # Convert columns and validate the chunk's readings at once
+    batch_data = _dataframe_to_batch(chunk)
+    
+    # Score the validated columns directly, without building a response per row
+    features = chunk[list(settings.FEATURE_COLUMNS)].to_numpy(dtype=np.float32)
+    scores, labels, severities = await asyncio.get_running_loop().run_in_executor(
+        request.app.state.prediction_executor, detector.score_batch, features
+    )
+    
+    frame = chunk[['sensor_id', *settings.FEATURE_COLUMNS]].reset_index(drop=True)
+    frame.insert(1, 'timestamp', [reading.timestamp for reading in batch_data.readings])
+    frame['is_anomaly'] = labels
+    frame['anomaly_score'] = scores
+    frame['confidence'] = np.minimum(scores * 1.5, 1.0)
+    frame['severity'] = severities
+    return frame
+
+def _summarize_predictions(predictions: List[PredictionResponse]) -> dict:
+    """Summary statistics for a list of predictions"""
+    anomaly_count = sum(1 for p in predictions if p.is_anomaly)
+    avg_score = np.mean([p.anomaly_score for p in predictions])
+    
+    return {
+        "total_readings": len(predictions),
+        "anomalies_detected": anomaly_count,
+        "anomaly_rate": anomaly_count / len(predictions),
+        "average_anomaly_score": float(avg_score),
+        "critical_anomalies": sum(1 for p in predictions if p.severity.value == "critical")
+    }
+
+def _dataframe_to_batch(df: pd.DataFrame) -> BatchSensorData:
+    """Validate a DataFrame of sensor readings as a batch in a single pass"""
+    columns = REQUIRED_COLUMNS + (['timestamp'] if 'timestamp' in df.columns else [])
+    df = df[columns].astype(CSV_DTYPES)
+    if 'timestamp' in df.columns:
+        # Missing timestamps fall back to the model default
+        df['timestamp'] = df['timestamp'].astype(object).where(df['timestamp'].notna(), None)
+    
+    return BatchSensorData.model_validate({'readings': df.to_dict(orient='records')})
 
 @router.post("/predict", response_model=PredictionResponse, tags=["predictions"])
-async def predict_anomaly(data: SensorData):
+async def predict_anomaly(data: SensorData, request: Request):
     """
     Predict if a single sensor reading is anomalous
     
@@ -40,14 +204,18 @@ async def predict_anomaly(data: SensorData):
         if not detector.is_ready:
             raise HTTPException(status_code=503, detail="Model not ready. Please train a model first.")
         
-        prediction = await detector.predict_single(data)
+        loop = asyncio.get_running_loop()
+        prediction = await loop.run_in_executor(
+            request.app.state.prediction_executor, detector.predict_single, data
+        )
+        record_prediction_alerts(request.app.state, [data], [prediction])
         return prediction
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 @router.post("/predict/batch", response_model=BatchPredictionResponse, tags=["predictions"])
-async def predict_batch_anomalies(data: BatchSensorData):
+async def predict_batch_anomalies(data: BatchSensorData, request: Request):
     """
     Predict anomalies for multiple sensor readings at once
     
@@ -61,38 +229,31 @@ async def predict_batch_anomalies(data: BatchSensorData):
         
         start_time = datetime.now()
         
-        # Process in batches to avoid memory issues
-        batch_size = 100
-        all_predictions = []
-        
-        for i in range(0, len(data.readings), batch_size):
-            batch = data.readings[i:i + batch_size]
-            batch_predictions = await detector.predict_batch(batch)
-            all_predictions.extend(batch_predictions)
-        
-        # Calculate summary
-        anomaly_count = sum(1 for p in all_predictions if p.is_anomaly)
-        avg_score = np.mean([p.anomaly_score for p in all_predictions])
+        # Predict the whole batch in one executor job so the event loop stays free
+        loop = asyncio.get_running_loop()
+        all_predictions = await loop.run_in_executor(
+            request.app.state.prediction_executor, detector.predict_batch, data.readings
+        )
         
         processing_time = (datetime.now() - start_time).total_seconds() * 1000
+        record_prediction_alerts(request.app.state, data.readings, all_predictions)
         
-        return BatchPredictionResponse(
+        response = BatchPredictionResponse(
             predictions=all_predictions,
-            summary={
-                "total_readings": len(all_predictions),
-                "anomalies_detected": anomaly_count,
-                "anomaly_rate": anomaly_count / len(all_predictions),
-                "average_anomaly_score": float(avg_score),
-                "critical_anomalies": sum(1 for p in all_predictions if p.severity.value == "critical")
-            },
+            summary=_summarize_predictions(all_predictions),
             processing_time_ms=processing_time
         )
+        
+        # The response is already a validated model; serialize it once with orjson
+        # instead of re-validating against response_model and running jsonable_encoder
+        return ORJSONResponse(content=response.model_dump())
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
-@router.post("/predict/upload", response_model=BatchPredictionResponse, tags=["predictions"])
+@router.post("/predict/upload", response_class=StreamingResponse, tags=["predictions"])
 async def predict_from_file(
+    request: Request,
     file: UploadFile = File(..., description="CSV file with sensor data"),
     delimiter: str = Query(",", description="CSV delimiter")
 ):
@@ -100,78 +261,85 @@ async def predict_from_file(
     Upload a CSV file with sensor data for batch prediction
     
     CSV should have columns: sensor_id,temperature,pressure,humidity,vibration,timestamp
+    
+    Returns the predictions as a CSV download, streamed one chunk at a time.
     """
     try:
-        # Read and validate CSV
-        contents = await file.read()
+        if not detector.is_ready:
+            raise HTTPException(status_code=503, detail="Model not ready")
         
-        # Try different encodings
-        for encoding in ['utf-8', 'latin-1', 'iso-8859-1']:
-            try:
-                df = pd.read_csv(io.BytesIO(contents), delimiter=delimiter, encoding=encoding)
-                break
-            except UnicodeDecodeError:
-                continue
-        else:
+        # Detect the encoding once from the head of the upload
+        encoding = _detect_encoding(await file.read(ENCODING_SNIFF_BYTES))
+        if encoding is None:
             raise HTTPException(status_code=400, detail="Could not decode file. Try UTF-8 encoding.")
+        await file.seek(0)
         
-        # Validate required columns
-        required_columns = ['sensor_id', 'temperature', 'pressure', 'humidity', 'vibration']
-        missing = [col for col in required_columns if col not in df.columns]
-        if missing:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Missing required columns: {missing}"
-            )
-        
-        # Convert to SensorData objects
-        readings = []
-        for _, row in df.iterrows():
-            readings.append(SensorData(
-                sensor_id=str(row['sensor_id']),
-                temperature=float(row['temperature']),
-                pressure=float(row['pressure']),
-                humidity=float(row['humidity']),
-                vibration=float(row['vibration']),
-                timestamp=row.get('timestamp', datetime.now())
-            ))
+        # Parse chunks in a worker thread while the previous chunk is being predicted
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=2)
         
-        # Create batch data
-        batch_data = BatchSensorData(readings=readings)
+        async def read_chunks():
+            try:
+                reader = await asyncio.to_thread(
+                    pd.read_csv, file.file,
+                    delimiter=delimiter, encoding=encoding,
+                    chunksize=CSV_CHUNK_SIZE, dtype=CSV_DTYPES
+                )
+                with reader:
+                    while (chunk := await asyncio.to_thread(next, reader, None)) is not None:
+                        await chunks.put(chunk)
+            except Exception as e:
+                await chunks.put(e)
+            else:
+                await chunks.put(None)
         
-        # Predict
-        response = await predict_batch_anomalies(batch_data)
+        async def next_chunk():
+            chunk = await chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            return chunk
         
-        # Save predictions to file
-        output_df = pd.DataFrame([p.dict() for p in response.predictions])
-        output_path = tempfile.mktemp(suffix=".csv")
-        output_df.to_csv(output_path, index=False)
+        reader_task = asyncio.create_task(read_chunks())
+        try:
+            # Score the first chunk up front so bad uploads still get an error status
+            chunk = await next_chunk()
+            if chunk is None or chunk.empty:
+                raise HTTPException(status_code=400, detail="Uploaded file contains no readings")
+            first_frame = await _score_chunk(chunk, request)
+        except BaseException:
+            reader_task.cancel()
+            raise
         
-        # Add download link to response
-        response.summary["download_url"] = f"/api/v1/predict/download/{os.path.basename(output_path)}"
+        async def predictions_csv():
+            # Each frame is written out before the next chunk is scored
+            try:
+                yield first_frame.to_csv(index=False)
+                while (chunk := await next_chunk()) is not None:
+                    frame = await _score_chunk(chunk, request)
+                    yield frame.to_csv(index=False, header=False)
+            except Exception as e:
+                # The status line is already sent, so the download is cut short
+                logger.error("File processing failed mid-stream: %s", e)
+                raise
+            finally:
+                reader_task.cancel()
         
-        return response
+        # Stream the predictions back as CSV instead of staging a file on disk
+        filename = f"predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        return StreamingResponse(
+            predictions_csv(),
+            media_type='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
     
+    except HTTPException:
+        raise
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Could not decode file. Try UTF-8 encoding.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
 
-@router.get("/predict/download/{filename}", tags=["predictions"])
-async def download_predictions(filename: str):
-    """
-    Download predictions as CSV file
-    """
-    file_path = os.path.join(tempfile.gettempdir(), filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    return FileResponse(
-        file_path, 
-        media_type='text/csv',
-        filename=f"predictions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    )
-
 @router.get("/model", response_model=ModelInfo, tags=["model"])
 async def get_model_info():
     """
@@ -191,8 +359,8 @@ async def get_model_info():
 
 @router.post("/model/train", response_model=TrainingResponse, tags=["model"])
 async def train_model(
-    request: TrainingRequest, 
-    background_tasks: BackgroundTasks
+    request: TrainingRequest,
+    http_request: Request
 ):
     """
     Train a new anomaly detection model
@@ -201,30 +369,35 @@ async def train_model(
     - **contamination**: Expected anomaly rate
     - **algorithm**: Algorithm to use (isolation_forest, one_class_svm, lof)
     
-    Training happens in the background. Check /model endpoint for status.
+    Training jobs run one at a time in the background. Check /model endpoint for status.
     """
     try:
-        # Start training in background
-        background_tasks.add_task(
-            detector.train_new_model,
-            n_samples=request.n_samples,
-            contamination=request.contamination,
-            algorithm=request.algorithm
-        )
+        model_id = f"model_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
+        # Queue the job for the single training worker
+        try:
+            http_request.app.state.training_queue.put_nowait(
+                (model_id, request.n_samples, request.contamination, request.algorithm)
+            )
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Training queue is full. Try again later.")
         
         return TrainingResponse(
             success=True,
-            model_id=f"model_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            model_id=model_id,
             training_time_seconds=0,  # Will be updated by background task
             model_metrics={},
-            message="Training started in background. Check /model endpoint for progress."
+            message="Training queued. Check /model endpoint for progress."
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start training: {str(e)}")
 
 @router.get("/alerts", response_model=List[AnomalyAlert], tags=["alerts"])
 async def get_recent_alerts(
+    request: Request,
     hours: int = Query(24, ge=1, le=168, description="Hours to look back"),
     severity: Optional[str] = Query(None, description="Filter by severity"),
     sensor_id: Optional[str] = Query(None, description="Filter by sensor ID")
@@ -239,41 +412,23 @@ async def get_recent_alerts(
     Returns list of recent alerts.
     """
     try:
-        # In production, this would query a database
-        # For now, return mock data
-        alerts = []
-        
-        # Generate mock alerts for demonstration
-        for i in range(min(50, hours * 6)):  # Up to 50 alerts
-            alert_time = datetime.now() - timedelta(minutes=i*10)
-            alerts.append(AnomalyAlert(
-                alert_id=f"alert_{alert_time.strftime('%Y%m%d_%H%M%S')}_{i}",
-                timestamp=alert_time,
-                sensor_id=f"sensor_{(i % 10):03d}",
-                severity="critical" if i % 5 == 0 else "warning",
-                anomaly_score=0.7 + (i * 0.01) % 0.3,
-                data=SensorData(
-                    sensor_id=f"sensor_{(i % 10):03d}",
-                    temperature=20 + np.random.normal(0, 5),
-                    pressure=1013 + np.random.normal(0, 20),
-                    humidity=50 + np.random.normal(0, 10),
-                    vibration=np.random.uniform(0, 2)
-                ),
-                acknowledged=i % 3 == 0,
-                acknowledged_by="admin" if i % 3 == 0 else None,
-                acknowledged_at=alert_time + timedelta(minutes=5) if i % 3 == 0 else None
-            ))
+        state = request.app.state
         
-        # Apply filters
-        if severity:
-            alerts = [a for a in alerts if a.severity.value == severity]
+        # Start from the narrowest index for the requested filters
         if sensor_id:
-            alerts = [a for a in alerts if a.sensor_id == sensor_id]
+            alerts = state.alerts_by_sensor.get(sensor_id, ())
+        elif severity:
+            alerts = state.alerts_by_severity.get(severity, ())
+        else:
+            alerts = state.alerts
         
-        # Sort by timestamp (newest first)
-        alerts.sort(key=lambda x: x.timestamp, reverse=True)
+        # Indexes are in time order: walk newest first and stop at the look-back cutoff
+        cutoff = datetime.now() - timedelta(hours=hours)
+        recent = takewhile(lambda a: a.timestamp >= cutoff, reversed(alerts))
+        if sensor_id and severity:
+            recent = (a for a in recent if a.severity.value == severity)
         
-        return alerts[:100]  # Limit to 100 alerts
+        return list(islice(recent, 100))  # Limit to 100 alerts
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get alerts: {str(e)}")
@@ -303,20 +458,15 @@ async def acknowledge_alert(
         raise HTTPException(status_code=500, detail=f"Failed to acknowledge alert: {str(e)}")
 
 @router.get("/metrics", tags=["monitoring"])
-async def get_metrics():
+async def get_metrics(request: Request):
     """
     Get system and model metrics
     
     Returns various metrics for monitoring and dashboards.
     """
     try:
-        import psutil
-        import platform
-        
-        # System metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        # System metrics (sampled in the background)
+        system_metrics = request.app.state.system_metrics
         
         # Model metrics
         model_info = await get_model_info()
@@ -326,16 +476,7 @@ async def get_metrics():
         anomalies_detected = total_predictions * 0.05  # 5% anomaly rate
         
         return {
-            "system": {
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory.percent,
-                "memory_available_gb": memory.available / (1024**3),
-                "disk_percent": disk.percent,
-                "disk_free_gb": disk.free / (1024**3),
-                "platform": platform.platform(),
-                "python_version": platform.python_version(),
-                "uptime_seconds": psutil.boot_time()
-            },
+            "system": system_metrics,
             "api": {
                 "total_predictions": total_predictions,
                 "anomalies_detected": int(anomalies_detected),
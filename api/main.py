@@ -4,7 +4,7 @@ Real-time Anomaly Detection API
 """
 from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import pandas as pd
@@ -13,17 +13,21 @@ from datetime import datetime, timedelta
 import joblib
 import os
 import logging
+import platform
+import psutil
 from typing import List, Optional, Dict, Any
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 
 # Import local modules
 from api.models import (
     SensorData, BatchSensorData, PredictionResponse, 
-    ModelInfo, HealthCheck, TrainingRequest
+    ModelInfo, HealthCheck, TrainingRequest, request_time
 )
 from core.anomaly_detector import AnomalyDetector
 from core.config import settings
-from api.endpoints import router
+from api.endpoints import router, init_alert_store, seed_mock_alerts, init_training_queue
 
 # Configure logging
 logging.basicConfig(
@@ -36,6 +40,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class RequestTimeMiddleware:
+    """Record each HTTP request's arrival time so defaulted timestamps share one clock read"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = request_time.set(datetime.now())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_time.reset(token)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AnomaLens API",
@@ -43,7 +63,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -55,6 +76,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Stamp request arrival time for defaulted reading timestamps
+app.add_middleware(RequestTimeMiddleware)
+
 # Include router
 app.include_router(router, prefix="/api/v1")
 
@@ -64,12 +88,58 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Global anomaly detector instance
 detector = None
 
+# Seconds between system metrics samples served by /api/v1/metrics
+SYSTEM_METRICS_INTERVAL = 5
+
+def sample_system_metrics() -> Dict[str, Any]:
+    """Take a non-blocking snapshot of system resource usage"""
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    return {
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_percent": memory.percent,
+        "memory_available_gb": memory.available / (1024**3),
+        "disk_percent": disk.percent,
+        "disk_free_gb": disk.free / (1024**3)
+    }
+
+async def refresh_system_metrics(system_info: Dict[str, Any]):
+    """Periodically refresh the cached system metrics"""
+    while True:
+        await asyncio.sleep(SYSTEM_METRICS_INTERVAL)
+        app.state.system_metrics = {**sample_system_metrics(), **system_info}
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize resources on startup"""
     global detector
     logger.info("🚀 Starting AnomaLens API...")
     
+    # Cache system metrics so /metrics never blocks on psutil sampling
+    system_info = {
+        "platform": platform.platform(),
+        "python_version": platform.python_version(),
+        "uptime_seconds": psutil.boot_time()
+    }
+    psutil.cpu_percent(interval=None)  # Prime the CPU counter
+    app.state.system_metrics = {**sample_system_metrics(), **system_info}
+    app.state.system_metrics_task = asyncio.create_task(refresh_system_metrics(system_info))
+    
+    # Model inference is blocking CPU work, run it off the event loop
+    app.state.prediction_executor = ThreadPoolExecutor(
+        max_workers=os.cpu_count(), thread_name_prefix="predict"
+    )
+    
+    # Training jobs are serialized through a single worker
+    init_training_queue(app.state)
+    
+    # Shared random generator for simulated data
+    app.state.rng = np.random.default_rng()
+    
+    # In-memory alert indexes served by /api/v1/alerts
+    init_alert_store(app.state)
+    seed_mock_alerts(app.state)
+    
     # Initialize anomaly detector
     detector = AnomalyDetector()
     
@@ -77,23 +147,26 @@ async def startup_event():
     try:
         if os.path.exists(settings.MODEL_PATH):
             detector.load_model(settings.MODEL_PATH)
-            logger.info(f"✅ Model loaded from {settings.MODEL_PATH}")
+            logger.info("✅ Model loaded from %s", settings.MODEL_PATH)
         else:
             logger.warning("⚠️ No pre-trained model found. Training initial model...")
             # Generate synthetic data for initial training
-            from core.data_generator import generate_training_data
-            X_train, _ = generate_training_data(n_samples=1000)
+            from core.data_generator import load_training_data
+            X_train, _ = load_training_data(n_samples=1000)
             detector.train(X_train)
             detector.save_model(settings.MODEL_PATH)
             logger.info("✅ Initial model trained and saved")
     except Exception as e:
-        logger.error(f"❌ Failed to initialize model: {e}")
+        logger.error("❌ Failed to initialize model: %s", e)
         raise
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("🛑 Shutting down AnomaLens API...")
+    app.state.system_metrics_task.cancel()
+    app.state.training_task.cancel()
+    app.state.prediction_executor.shutdown(wait=False, cancel_futures=True)
     # Save any pending data or models
     if detector and hasattr(detector, 'model'):
         detector.save_model(settings.MODEL_PATH + ".backup")
@@ -151,7 +224,7 @@ async def http_exception_handler(request, exc):
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    logger.error(f"Unhandled exception: {exc}")
+    logger.error("Unhandled exception: %s", exc)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "error": str(exc)}
@@ -164,6 +237,7 @@ from fastapi import WebSocket, WebSocketDisconnect
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket for real-time anomaly alerts"""
     await websocket.accept()
+    rng = app.state.rng
     try:
         while True:
             # Simulate real-time data (in production, connect to Kafka)
@@ -171,21 +245,34 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # Generate mock sensor data
             mock_data = {
-                "sensor_id": f"sensor_{np.random.randint(1, 10):03d}",
+                "sensor_id": f"sensor_{rng.integers(1, 10):03d}",
                 "timestamp": datetime.now().isoformat(),
-                "temperature": 20 + np.random.normal(0, 3),
-                "pressure": 1013 + np.random.normal(0, 15),
-                "is_anomaly": np.random.random() > 0.9
+                "temperature": 20 + rng.normal(0, 3),
+                "pressure": 1013 + rng.normal(0, 15),
+                "humidity": 50 + rng.normal(0, 5),
+                "vibration": rng.uniform(0, 0.5),
+                "is_anomaly": rng.random() > 0.9
             }
             
             # Predict if not already marked
             if not mock_data["is_anomaly"]:
-                sensor_data = SensorData(**mock_data)
-                prediction = await detector.predict_single(sensor_data)
+                sensor_data = SensorData(
+                    sensor_id=mock_data["sensor_id"],
+                    temperature=mock_data["temperature"],
+                    pressure=mock_data["pressure"],
+                    humidity=mock_data["humidity"],
+                    vibration=mock_data["vibration"]
+                )
+                prediction = await asyncio.get_running_loop().run_in_executor(
+                    app.state.prediction_executor, detector.predict_single, sensor_data
+                )
                 mock_data["is_anomaly"] = prediction.is_anomaly
                 mock_data["anomaly_score"] = prediction.anomaly_score
             
-            await websocket.send_json(mock_data)
+            # orjson handles the numpy scalars in mock_data without a stdlib json pass
+            await websocket.send_text(
+                orjson.dumps(mock_data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC).decode()
+            )
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
 
@@ -1,10 +1,18 @@
 """
 Pydantic models for request/response validation
 """
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 from enum import Enum
+from contextvars import ContextVar
+
+# Arrival time of the current HTTP request, set once per request by the API middleware
+request_time: ContextVar[Optional[datetime]] = ContextVar('request_time', default=None)
+
+def request_now() -> datetime:
+    """Return the current request's arrival time, or the wall clock outside a request"""
+    return request_time.get() or datetime.now()
 
 class Severity(str, Enum):
     """Anomaly severity levels"""
@@ -14,8 +22,10 @@ class Severity(str, Enum):
 
 class SensorData(BaseModel):
     """Single sensor reading"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     sensor_id: str = Field(..., description="Unique sensor identifier")
-    timestamp: Optional[datetime] = Field(default_factory=datetime.now, description="Timestamp of reading")
+    timestamp: datetime = Field(default_factory=request_now, description="Timestamp of reading")
     temperature: float = Field(..., ge=-50, le=100, description="Temperature in Celsius")
     pressure: float = Field(..., ge=900, le=1100, description="Pressure in hPa")
     humidity: float = Field(..., ge=0, le=100, description="Humidity percentage")
@@ -23,30 +33,35 @@ class SensorData(BaseModel):
     location: Optional[str] = Field(None, description="Sensor location")
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional metadata")
     
-    @validator('timestamp', pre=True, always=True)
+    @field_validator('timestamp', mode='before')
+    @classmethod
     def parse_timestamp(cls, v):
         if v is None:
-            return datetime.now()
+            return request_now()
         if isinstance(v, str):
             try:
                 return datetime.fromisoformat(v.replace('Z', '+00:00'))
-            except:
-                return datetime.now()
+            except ValueError:
+                return request_now()
         return v
 
 class BatchSensorData(BaseModel):
     """Batch of sensor readings"""
-    readings: List[SensorData] = Field(..., min_items=1, max_items=1000)
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
+    readings: List[SensorData] = Field(..., min_length=1, max_length=1000)
     
-    @validator('readings')
+    @field_validator('readings')
+    @classmethod
     def check_unique_sensor_ids(cls, v):
-        sensor_ids = [reading.sensor_id for reading in v]
-        if len(set(sensor_ids)) < len(sensor_ids):
+        if len({reading.sensor_id for reading in v}) != len(v):
             raise ValueError("Duplicate sensor_ids found in batch")
         return v
 
 class PredictionResponse(BaseModel):
     """Prediction response"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     sensor_id: str
     timestamp: datetime
     is_anomaly: bool
@@ -55,26 +70,19 @@ class PredictionResponse(BaseModel):
     severity: Severity = Field(default=Severity.INFO, description="Anomaly severity")
     features: Dict[str, float] = Field(..., description="Original feature values")
     recommendations: List[str] = Field(default_factory=list, description="Recommended actions")
-    
-    @validator('severity', always=True)
-    def set_severity_based_on_score(cls, v, values):
-        """Set severity based on anomaly score"""
-        if 'anomaly_score' in values:
-            score = values['anomaly_score']
-            if score > 0.8:
-                return Severity.CRITICAL
-            elif score > 0.6:
-                return Severity.WARNING
-        return Severity.INFO
 
 class BatchPredictionResponse(BaseModel):
     """Batch prediction response"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     predictions: List[PredictionResponse]
     summary: Dict[str, Any] = Field(..., description="Prediction summary")
     processing_time_ms: float = Field(..., description="Total processing time in milliseconds")
 
 class ModelInfo(BaseModel):
     """Model information"""
+    model_config = ConfigDict(frozen=True, protected_namespaces=())
+    
     model_type: str
     version: str
     training_date: datetime
@@ -87,19 +95,16 @@ class ModelInfo(BaseModel):
 
 class TrainingRequest(BaseModel):
     """Model training request"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     n_samples: int = Field(default=1000, ge=100, le=10000, description="Number of samples to generate for training")
     contamination: float = Field(default=0.1, ge=0.01, le=0.3, description="Expected anomaly rate")
-    algorithm: str = Field(default="isolation_forest", description="Algorithm to use")
-    
-    @validator('algorithm')
-    def validate_algorithm(cls, v):
-        valid_algorithms = ['isolation_forest', 'one_class_svm', 'lof']
-        if v not in valid_algorithms:
-            raise ValueError(f"Algorithm must be one of {valid_algorithms}")
-        return v
+    algorithm: Literal['isolation_forest', 'one_class_svm', 'lof'] = Field(default="isolation_forest", description="Algorithm to use")
 
 class TrainingResponse(BaseModel):
     """Training response"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     success: bool
     model_id: str
     training_time_seconds: float
@@ -108,6 +113,8 @@ class TrainingResponse(BaseModel):
 
 class HealthCheck(BaseModel):
     """Health check response"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     status: str
     timestamp: datetime
     model_status: str
@@ -116,6 +123,8 @@ class HealthCheck(BaseModel):
 
 class AnomalyAlert(BaseModel):
     """Anomaly alert for notification"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     alert_id: str
     timestamp: datetime
     sensor_id: str
@@ -1,12 +1,16 @@
 """
 Anomaly detection model wrapper
 """
+import os
+import operator
+import pickle
 import joblib
 import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import asyncio
+import threading
 from sklearn.ensemble import IsolationForest
 from sklearn.svm import OneClassSVM
 from sklearn.neighbors import LocalOutlierFactor
@@ -15,9 +19,60 @@ from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_sc
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+try:
+    import onnxruntime as ort
+    from skl2onnx import to_onnx
+except ImportError:
+    ort = None
+
 from api.models import SensorData, PredictionResponse
 from core.config import settings
 
+# (severity, recommended actions) indexed by severity code:
+# (score > WARNING_THRESHOLD) + (score > CRITICAL_THRESHOLD)
+SEVERITY_TABLE = (
+    ("info", ("Continue normal monitoring",)),
+    ("warning", (
+        "Monitor sensor closely",
+        "Check for environmental changes"
+    )),
+    ("critical", (
+        "Immediate investigation required",
+        "Check sensor for faults",
+        "Review recent sensor history"
+    ))
+)
+
+# Feature order shared by the model input matrix and response feature dicts
+FEATURE_KEYS = settings.FEATURE_COLUMNS
+get_features = operator.attrgetter(*FEATURE_KEYS)
+
+# Severity thresholds, bound once since settings are frozen
+CRITICAL_THRESHOLD = settings.ALERT_THRESHOLD_CRITICAL
+WARNING_THRESHOLD = settings.ALERT_THRESHOLD_WARNING
+
+# Opsets for exported models (skl2onnx's tree converters support ai.onnx.ml up to 3)
+ONNX_TARGET_OPSET = {'': 17, 'ai.onnx.ml': 3}
+
+# Magic number opening every zstandard frame
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Severity names indexed by severity code
+SEVERITY_LEVELS_ARRAY = np.array([severity for severity, _ in SEVERITY_TABLE])
+
+def postprocess_scores(raw_scores: np.ndarray, critical_threshold: float, warning_threshold: float):
+    """Map raw score_samples output to 0-1 anomaly scores and int8 severity codes"""
+    # Lower raw score = more anomalous, so squash the negated score with a sigmoid
+    anomaly_scores = 1.0 / (1.0 + np.exp(raw_scores))
+    severity_codes = (anomaly_scores > warning_threshold).astype(np.int8)
+    severity_codes += anomaly_scores > critical_threshold
+    return anomaly_scores, severity_codes
+
 class AnomalyDetector:
     """Main anomaly detection class"""
     
@@ -27,30 +82,87 @@ class AnomalyDetector:
         self.is_ready = False
         self.model_info = {}
         self.training_history = []
+        
+        # Scaler parameters as plain arrays so scoring skips sklearn's transform overhead
+        self._mean = None
+        self._inv_scale = None
+        
+        # Serialized ONNX model and its inference session (None when scoring with sklearn)
+        self._onnx = None
+        self._onnx_session = None
+        
+        # Guards swapping the (model, scaler) pair so predictions never see a mix
+        self._lock = threading.Lock()
     
     def load_model(self, model_path: str) -> bool:
-        """Load pre-trained model from file"""
+        """Load pre-trained model from a zstandard pickle or a joblib file"""
         try:
-            loaded_data = joblib.load(model_path)
-            self.model = loaded_data['model']
-            self.scaler = loaded_data['scaler']
-            self.model_info = loaded_data.get('model_info', {})
-            self.is_ready = True
+            with open(model_path, 'rb') as f:
+                is_zstd = f.read(len(ZSTD_MAGIC)) == ZSTD_MAGIC
+            
+            if is_zstd:
+                if zstd is None:
+                    raise RuntimeError("Model is zstandard-compressed but zstandard is not installed")
+                with open(model_path, 'rb') as f, zstd.ZstdDecompressor().stream_reader(f) as reader:
+                    loaded_data = pickle.load(reader)
+            else:
+                # Memory-map the numpy arrays (read-only views) instead of copying them into the heap
+                loaded_data = joblib.load(model_path, mmap_mode='r')
+            onnx_model, onnx_session = self._build_onnx(loaded_data['model'], loaded_data.get('onnx'))
+            with self._lock:
+                self.model = loaded_data['model']
+                self.scaler = loaded_data['scaler']
+                self._mean, self._inv_scale = self._scaler_arrays(self.scaler)
+                self._onnx, self._onnx_session = onnx_model, onnx_session
+                self.model_info = loaded_data.get('model_info', {})
+                self.is_ready = True
             return True
         except Exception as e:
             print(f"Failed to load model: {e}")
             return False
     
+    @staticmethod
+    def _scaler_arrays(scaler: StandardScaler):
+        """Return the fitted scaler's (mean, 1/scale) as float32 arrays"""
+        return scaler.mean_.astype(np.float32), (1.0 / scaler.scale_).astype(np.float32)
+    
+    @staticmethod
+    def _build_onnx(model, onnx_model: Optional[bytes] = None):
+        """Return (onnx_bytes, session) for an IsolationForest, or (None, None) to score with sklearn"""
+        if not settings.USE_ONNX_RUNTIME or ort is None or not isinstance(model, IsolationForest):
+            return None, None
+        try:
+            if onnx_model is None:
+                sample = np.zeros((1, len(FEATURE_KEYS)), dtype=np.float32)
+                onnx_model = to_onnx(model, sample, target_opset=ONNX_TARGET_OPSET).SerializeToString()
+            session = ort.InferenceSession(onnx_model, providers=['CPUExecutionProvider'])
+            return onnx_model, session
+        except Exception as e:
+            print(f"ONNX conversion failed, scoring with sklearn: {e}")
+            return None, None
+    
     def save_model(self, model_path: str) -> bool:
         """Save model to file"""
         try:
-            save_data = {
-                'model': self.model,
-                'scaler': self.scaler,
-                'model_info': self.model_info,
-                'timestamp': datetime.now().isoformat()
-            }
-            joblib.dump(save_data, model_path)
+            with self._lock:
+                save_data = {
+                    'model': self.model,
+                    'scaler': self.scaler,
+                    'model_info': self.model_info,
+                    'onnx': self._onnx,
+                    'timestamp': datetime.now().isoformat()
+                }
+            # Write aside and swap so a memory-mapped copy of the old file
+            # is never truncated under a reader
+            tmp_path = f"{model_path}.tmp"
+            if zstd is not None:
+                cctx = zstd.ZstdCompressor(level=3, threads=-1)
+                with open(tmp_path, 'wb') as f, cctx.stream_writer(f) as writer:
+                    pickle.dump(save_data, writer, protocol=5)
+            else:
+                # Uncompressed so arrays stay mmap-able
+                joblib.dump(save_data, tmp_path, compress=0, protocol=5)
+            os.replace(tmp_path, model_path)
             return True
         except Exception as e:
             print(f"Failed to save model: {e}")
@@ -58,25 +170,31 @@ class AnomalyDetector:
     
     def train(self, X: np.ndarray, algorithm: str = "isolation_forest", contamination: float = 0.1):
         """Train anomaly detection model"""
-        # Scale the data
-        X_scaled = self.scaler.fit_transform(X)
+        # Sensor readings need no more than float32 precision
+        X = np.asarray(X, dtype=np.float32)
+        
+        # Fit into local objects so predictions keep using the current model meanwhile
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
         
         # Choose algorithm
         if algorithm == "isolation_forest":
-            self.model = IsolationForest(
+            model = IsolationForest(
                 contamination=contamination,
                 random_state=42,
                 n_estimators=100,
-                max_samples='auto'
+                max_samples=min(256, len(X)),
+                bootstrap=False,
+                n_jobs=-1
             )
         elif algorithm == "one_class_svm":
-            self.model = OneClassSVM(
+            model = OneClassSVM(
                 nu=contamination,
                 kernel='rbf',
                 gamma='scale'
             )
         elif algorithm == "lof":
-            self.model = LocalOutlierFactor(
+            model = LocalOutlierFactor(
                 n_neighbors=20,
                 contamination=contamination,
                 novelty=True
@@ -85,20 +203,29 @@ class AnomalyDetector:
             raise ValueError(f"Unknown algorithm: {algorithm}")
         
         # Train model
-        self.model.fit(X_scaled)
+        model.fit(X_scaled)
         
         # Update model info
-        self.model_info = {
+        model_info = {
             'model_type': algorithm,
             'version': '1.0',
             'training_date': datetime.now().isoformat(),
-            'features': settings.FEATURE_COLUMNS,
+            'features': list(settings.FEATURE_COLUMNS),
             'contamination': contamination,
             'n_samples': len(X),
-            'parameters': self.model.get_params()
+            'parameters': model.get_params()
         }
         
-        self.is_ready = True
+        onnx_model, onnx_session = self._build_onnx(model)
+        
+        # Swap the fitted pair in atomically
+        with self._lock:
+            self.model = model
+            self.scaler = scaler
+            self._mean, self._inv_scale = self._scaler_arrays(scaler)
+            self._onnx, self._onnx_session = onnx_model, onnx_session
+            self.model_info = model_info
+            self.is_ready = True
         self.training_history.append({
             'timestamp': datetime.now(),
             'algorithm': algorithm,
@@ -108,9 +235,14 @@ class AnomalyDetector:
     
     async def train_new_model(self, n_samples: int = 1000, contamination: float = 0.1, algorithm: str = "isolation_forest"):
         """Train new model asynchronously"""
+        # Fitting is blocking CPU work, keep it off the event loop
+        await asyncio.to_thread(self.train_new_model_sync, n_samples, contamination, algorithm)
+    
+    def train_new_model_sync(self, n_samples: int = 1000, contamination: float = 0.1, algorithm: str = "isolation_forest"):
+        """Generate data, train and save a new model (blocking, for use in an executor)"""
         # Generate training data
-        from core.data_generator import generate_training_data
-        X_train, _ = generate_training_data(n_samples=n_samples, anomaly_rate=contamination)
+        from core.data_generator import load_training_data
+        X_train, _ = load_training_data(n_samples=n_samples, anomaly_rate=contamination)
         
         # Train model
         self.train(X_train, algorithm=algorithm, contamination=contamination)
@@ -120,80 +252,78 @@ class AnomalyDetector:
         
         print(f"✅ New model trained with {n_samples} samples using {algorithm}")
     
-    async def predict_single(self, sensor_data: SensorData) -> PredictionResponse:
+    def predict_single(self, sensor_data: SensorData) -> PredictionResponse:
         """Predict anomaly for single sensor reading"""
+        # Share the vectorized scoring and postprocessing path with batches
+        return self.predict_batch([sensor_data])[0]
+    
+    def score_batch(self, features: np.ndarray):
+        """Score a feature matrix, returning (anomaly_scores, is_anomaly, severities) arrays"""
+        anomaly_scores, is_anomaly, severity_codes = self._score(features)
+        return anomaly_scores, is_anomaly, SEVERITY_LEVELS_ARRAY[severity_codes]
+    
+    def _score(self, features: np.ndarray):
+        """Score a feature matrix, returning (anomaly_scores, is_anomaly, severity_codes) arrays"""
         if not self.is_ready:
             raise ValueError("Model not trained. Please train or load a model first.")
         
-        # Prepare features
-        features = np.array([[
-            sensor_data.temperature,
-            sensor_data.pressure,
-            sensor_data.humidity,
-            sensor_data.vibration
-        ]])
-        
-        # Scale features
-        features_scaled = self.scaler.transform(features)
-        
-        # Predict
-        prediction = self.model.predict(features_scaled)
-        score_samples = self.model.score_samples(features_scaled)
-        
-        # Convert to anomaly score (0=normal, 1=anomaly)
-        # IsolationForest: lower score = more anomalous
-        if hasattr(self.model, 'score_samples'):
-            anomaly_score = -score_samples[0]  # Negative because lower score = more anomalous
-            # Normalize to 0-1
-            anomaly_score = 1 / (1 + np.exp(-anomaly_score))
-        else:
-            anomaly_score = 0.5 if prediction[0] == -1 else 0.1
-        
-        is_anomaly = prediction[0] == -1
-        
-        # Determine severity
-        if anomaly_score > settings.ALERT_THRESHOLD_CRITICAL:
-            severity = "critical"
-            recommendations = [
-                "Immediate investigation required",
-                "Check sensor for faults",
-                "Review recent sensor history"
-            ]
-        elif anomaly_score > settings.ALERT_THRESHOLD_WARNING:
-            severity = "warning"
-            recommendations = [
-                "Monitor sensor closely",
-                "Check for environmental changes"
-            ]
+        with self._lock:
+            model, mean, inv_scale = self.model, self._mean, self._inv_scale
+            onnx_session = self._onnx_session
+        
+        # Same as scaler.transform, inlined
+        features_scaled = (features - mean) * inv_scale
+        if onnx_session is not None:
+            # The ONNX graph outputs decision_function, i.e. score_samples - offset_
+            onnx_scores = onnx_session.run(['scores'], {'X': features_scaled.astype(np.float32)})[0]
+            raw_scores = onnx_scores.ravel() + model.offset_
         else:
-            severity = "info"
-            recommendations = ["Continue normal monitoring"]
-        
-        return PredictionResponse(
-            sensor_id=sensor_data.sensor_id,
-            timestamp=sensor_data.timestamp or datetime.now(),
-            is_anomaly=bool(is_anomaly),
-            anomaly_score=float(anomaly_score),
-            confidence=float(min(anomaly_score * 1.5, 1.0)),  # Simple confidence calculation
-            severity=severity,
-            features={
-                'temperature': sensor_data.temperature,
-                'pressure': sensor_data.pressure,
-                'humidity': sensor_data.humidity,
-                'vibration': sensor_data.vibration
-            },
-            recommendations=recommendations
+            raw_scores = model.score_samples(features_scaled)
+        
+        # predict() is decision_function < 0, i.e. score_samples below offset_ for
+        # IsolationForest, OneClassSVM and LOF; reuse the scores instead of a second pass
+        is_anomaly = raw_scores < model.offset_
+        
+        anomaly_scores, severity_codes = postprocess_scores(
+            raw_scores,
+            CRITICAL_THRESHOLD,
+            WARNING_THRESHOLD
         )
+        return anomaly_scores, is_anomaly, severity_codes
     
-    async def predict_batch(self, sensor_readings: List[SensorData]) -> List[PredictionResponse]:
+    def predict_batch(self, sensor_readings: List[SensorData]) -> List[PredictionResponse]:
         """Predict anomalies for batch of sensor readings"""
-        predictions = []
+        if not sensor_readings:
+            return []
         
-        for reading in sensor_readings:
-            prediction = await self.predict_single(reading)
-            predictions.append(prediction)
+        # Stack the batch into one (N, 4) matrix and score it in a single model call
+        rows = [get_features(r) for r in sensor_readings]
+        features = np.array(rows, dtype=np.float32)
+        anomaly_scores, is_anomaly, severity_codes = self._score(features)
+        confidences = np.minimum(anomaly_scores * 1.5, 1.0)
         
-        return predictions
+        now = datetime.now()
+        return [
+            PredictionResponse(
+                sensor_id=reading.sensor_id,
+                timestamp=reading.timestamp or now,
+                is_anomaly=flag,
+                anomaly_score=score,
+                confidence=confidence,
+                severity=SEVERITY_TABLE[code][0],
+                features=dict(zip(FEATURE_KEYS, row)),
+                recommendations=SEVERITY_TABLE[code][1]
+            )
+            for reading, row, score, flag, confidence, code in zip(
+                sensor_readings, rows, anomaly_scores.tolist(), is_anomaly.tolist(),
+                confidences.tolist(), severity_codes.tolist()
+            )
+        ]
+    
+    async def predict_batch_async(self, sensor_readings: List[SensorData]) -> List[PredictionResponse]:
+        """Predict anomalies for batch of sensor readings asynchronously"""
+        # Hand the whole batch to one worker thread instead of awaiting per reading
+        return await asyncio.to_thread(self.predict_batch, sensor_readings)
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model"""
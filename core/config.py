@@ -1,13 +1,16 @@
 """
 Configuration settings
 """
-from pydantic_settings import BaseSettings
-from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Optional, Tuple
 import os
 
 class Settings(BaseSettings):
     """Application settings"""
     
+    # Frozen so values bound at import time elsewhere can't go stale
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=False, frozen=True)
+    
     # API Settings
     APP_NAME: str = "AnomaLens"
     VERSION: str = "1.0.0"
@@ -19,9 +22,11 @@ class Settings(BaseSettings):
     MODEL_PATH: str = "models/anomaly_detector.joblib"
     MODEL_TYPE: str = "isolation_forest"
     DEFAULT_CONTAMINATION: float = 0.1
+    USE_ONNX_RUNTIME: bool = False  # Score IsolationForest models with onnxruntime when installed
     
     # Data Settings
-    FEATURE_COLUMNS: list = ['temperature', 'pressure', 'humidity', 'vibration']
+    FEATURE_COLUMNS: Tuple[str, ...] = ('temperature', 'pressure', 'humidity', 'vibration')
+    TRAINING_DATA_CACHE_DIR: str = "data"
     
     # Alert Settings
     ALERT_THRESHOLD_CRITICAL: float = 0.8
@@ -32,15 +37,11 @@ class Settings(BaseSettings):
     
     # Security
     API_KEY: Optional[str] = None
-    CORS_ORIGINS: list = ["*"]
+    CORS_ORIGINS: Tuple[str, ...] = ("*",)
     
     # Monitoring
     ENABLE_METRICS: bool = True
     METRICS_PORT: int = 9090
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
 
 # Create settings instance
 settings = Settings()
@@ -1,76 +1,105 @@
 """
 Data generation utilities
 """
+import os
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
 
-def generate_training_data(n_samples: int = 1000, anomaly_rate: float = 0.1) -> tuple:
+from core.config import settings
+
+# Bump whenever generate_training_data's output changes so stale disk caches are ignored
+GENERATOR_VERSION = 2
+
+# Per sample type (normal, temperature spike, pressure drop, high vibration) and
+# feature (temperature, pressure, humidity, vibration): normal draws use loc=mean,
+# scale=std; uniform draws use loc=low, scale=high-low
+TRAINING_LOC = np.array([
+    [20, 1013, 50, 0.0],
+    [35, 1013, 50, 0.0],
+    [20, 913, 50, 0.0],
+    [20, 1013, 50, 1.0]
+], dtype=np.float32)
+TRAINING_SCALE = np.array([
+    [2, 10, 5, 0.5],
+    [15, 10, 5, 0.5],
+    [2, 50, 5, 0.5],
+    [2, 10, 5, 1.0]
+], dtype=np.float32)
+TRAINING_UNIFORM = np.array([
+    [False, False, False, True],
+    [True, False, False, True],
+    [False, True, False, True],
+    [False, False, False, True]
+])
+
+def generate_training_data(n_samples: int = 1000, anomaly_rate: float = 0.1, seed: Optional[int] = 42) -> tuple:
     """
     Generate synthetic training data for anomaly detection
     
     Args:
         n_samples: Number of samples to generate
         anomaly_rate: Proportion of anomalies in data
+        seed: Seed for the random generator (None for fresh entropy)
     
     Returns:
         tuple: (X, y) where X is feature matrix and y is labels (1=anomaly, 0=normal)
     """
-    np.random.seed(42)
+    rng = np.random.default_rng(seed)
     
-    # Generate normal data
+    # Split samples between normal readings and the three anomaly types
     n_normal = int(n_samples * (1 - anomaly_rate))
     n_anomaly = n_samples - n_normal
+    type_counts = [n_normal, n_anomaly // 3, n_anomaly // 3, n_anomaly - 2*(n_anomaly // 3)]
+    type_ids = np.repeat(np.arange(len(type_counts)), type_counts)
     
-    # Normal sensor readings
-    normal_temp = 20 + np.random.normal(0, 2, n_normal)
-    normal_pressure = 1013 + np.random.normal(0, 10, n_normal)
-    normal_humidity = 50 + np.random.normal(0, 5, n_normal)
-    normal_vibration = np.random.uniform(0, 0.5, n_normal)
-    
-    # Anomalous sensor readings (various types)
-    # Type 1: Temperature spikes
-    anomaly_temp1 = 20 + np.random.uniform(15, 30, n_anomaly // 3)
-    anomaly_pressure1 = 1013 + np.random.normal(0, 10, n_anomaly // 3)
-    anomaly_humidity1 = 50 + np.random.normal(0, 5, n_anomaly // 3)
-    anomaly_vibration1 = np.random.uniform(0, 0.5, n_anomaly // 3)
-    
-    # Type 2: Pressure drops
-    anomaly_temp2 = 20 + np.random.normal(0, 2, n_anomaly // 3)
-    anomaly_pressure2 = 1013 - np.random.uniform(50, 100, n_anomaly // 3)
-    anomaly_humidity2 = 50 + np.random.normal(0, 5, n_anomaly // 3)
-    anomaly_vibration2 = np.random.uniform(0, 0.5, n_anomaly // 3)
-    
-    # Type 3: High vibration
-    anomaly_temp3 = 20 + np.random.normal(0, 2, n_anomaly - 2*(n_anomaly // 3))
-    anomaly_pressure3 = 1013 + np.random.normal(0, 10, n_anomaly - 2*(n_anomaly // 3))
-    anomaly_humidity3 = 50 + np.random.normal(0, 5, n_anomaly - 2*(n_anomaly // 3))
-    anomaly_vibration3 = np.random.uniform(1.0, 2.0, n_anomaly - 2*(n_anomaly // 3))
-    
-    # Combine all data
-    temperature = np.concatenate([normal_temp, anomaly_temp1, anomaly_temp2, anomaly_temp3])
-    pressure = np.concatenate([normal_pressure, anomaly_pressure1, anomaly_pressure2, anomaly_pressure3])
-    humidity = np.concatenate([normal_humidity, anomaly_humidity1, anomaly_humidity2, anomaly_humidity3])
-    vibration = np.concatenate([normal_vibration, anomaly_vibration1, anomaly_vibration2, anomaly_vibration3])
-    
-    # Create feature matrix
-    X = np.column_stack([temperature, pressure, humidity, vibration])
+    # Draw all noise at once, then shape it per sample type
+    z = rng.standard_normal((n_samples, 4), dtype=np.float32)
+    u = rng.random((n_samples, 4), dtype=np.float32)
+    uniform = TRAINING_UNIFORM[type_ids]
+    X = TRAINING_LOC[type_ids] + TRAINING_SCALE[type_ids] * np.where(uniform, u, z)
     
     # Create labels (1 for anomalies, 0 for normal)
-    y = np.concatenate([
-        np.zeros(n_normal),
-        np.ones(n_anomaly)
-    ])
+    y = (type_ids > 0).astype(float)
     
     # Shuffle data
-    indices = np.arange(n_samples)
-    np.random.shuffle(indices)
+    indices = rng.permutation(n_samples)
     X = X[indices]
     y = y[indices]
     
     return X, y
 
-def generate_live_sensor_data(n_sensors: int = 10, hours: int = 24) -> pd.DataFrame:
+@lru_cache(maxsize=8)
+def load_training_data(n_samples: int = 1000, anomaly_rate: float = 0.1, seed: int = 42) -> tuple:
+    """
+    Return generate_training_data output, memoized in process and on disk
+    
+    The disk cache is keyed on GENERATOR_VERSION and every argument, seed included.
+    The arrays are shared between callers and marked read-only.
+    """
+    cache_path = os.path.join(
+        settings.TRAINING_DATA_CACHE_DIR,
+        f"train_v{GENERATOR_VERSION}_{n_samples}_{anomaly_rate:g}_s{seed}.npz"
+    )
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            X, y = cached['X'], cached['y']
+    else:
+        X, y = generate_training_data(n_samples=n_samples, anomaly_rate=anomaly_rate, seed=seed)
+        
+        # Write aside and swap so a concurrent reader never sees a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, X=X, y=y)
+        os.replace(tmp_path, cache_path)
+    
+    X.flags.writeable = False
+    y.flags.writeable = False
+    return X, y
+
+def generate_live_sensor_data(n_sensors: int = 10, hours: int = 24, seed: Optional[int] = None) -> pd.DataFrame:
     """
     Generate time-series sensor data for testing
     """
@@ -80,43 +109,37 @@ def generate_live_sensor_data(n_sensors: int = 10, hours: int = 24) -> pd.DataFr
         freq='5min'
     )
     
-    data = []
+    rng = np.random.default_rng(seed)
+    grid = (n_sensors, len(timestamps))
+    
+    # Base values with some sensor-specific offset, one row per sensor
+    sensor_ids = np.arange(n_sensors)[:, None]
+    base_temp = 20 + sensor_ids * 0.5
+    base_pressure = 1013 + sensor_ids * 2
+    
+    # Add daily pattern
+    temp_variation = 3 * np.sin(2 * np.pi * timestamps.hour.to_numpy() / 24)
+    
+    # Add random noise
+    temp = base_temp + temp_variation + rng.normal(0, 0.5, grid)
+    pressure = base_pressure + rng.normal(0, 2, grid)
+    humidity = 50 + rng.normal(0, 3, grid)
+    vibration = rng.uniform(0, 0.2, grid)
     
-    for sensor_id in range(n_sensors):
-        for ts in timestamps:
-            # Base values with some sensor-specific offset
-            base_temp = 20 + sensor_id * 0.5
-            base_pressure = 1013 + sensor_id * 2
-            
-            # Add daily pattern
-            hour = ts.hour
-            temp_variation = 3 * np.sin(2 * np.pi * hour / 24)
-            
-            # Add random noise
-            temp = base_temp + temp_variation + np.random.normal(0, 0.5)
-            pressure = base_pressure + np.random.normal(0, 2)
-            humidity = 50 + np.random.normal(0, 3)
-            vibration = np.random.uniform(0, 0.2)
-            
-            # Occasionally add anomaly
-            is_anomaly = np.random.random() < 0.02
-            if is_anomaly:
-                anomaly_type = np.random.choice(['temp_spike', 'pressure_drop', 'vibration_high'])
-                if anomaly_type == 'temp_spike':
-                    temp += np.random.uniform(10, 25)
-                elif anomaly_type == 'pressure_drop':
-                    pressure -= np.random.uniform(50, 100)
-                else:
-                    vibration += np.random.uniform(1.0, 2.0)
-            
-            data.append({
-                'sensor_id': f'sensor_{sensor_id:03d}',
-                'timestamp': ts,
-                'temperature': temp,
-                'pressure': pressure,
-                'humidity': humidity,
-                'vibration': vibration,
-                'is_anomaly': int(is_anomaly)
-            })
+    # Occasionally add anomaly (0=temp_spike, 1=pressure_drop, 2=vibration_high)
+    is_anomaly = rng.random(grid) < 0.02
+    anomaly_type = rng.integers(0, 3, grid)
+    temp += np.where(is_anomaly & (anomaly_type == 0), rng.uniform(10, 25, grid), 0)
+    pressure -= np.where(is_anomaly & (anomaly_type == 1), rng.uniform(50, 100, grid), 0)
+    vibration += np.where(is_anomaly & (anomaly_type == 2), rng.uniform(1.0, 2.0, grid), 0)
     
-    return pd.DataFrame(data)
\ No newline at end of file
+    # Flatten sensor-major, matching one block of timestamps per sensor
+    return pd.DataFrame({
+        'sensor_id': np.repeat([f'sensor_{i:03d}' for i in range(n_sensors)], len(timestamps)),
+        'timestamp': np.tile(timestamps, n_sensors),
+        'temperature': temp.ravel(),
+        'pressure': pressure.ravel(),
+        'humidity': humidity.ravel(),
+        'vibration': vibration.ravel(),
+        'is_anomaly': is_anomaly.ravel().astype(int)
+    })
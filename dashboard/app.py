@@ -1,89 +1,366 @@
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output, State
+from dash import dcc, html, Patch, no_update
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import plotly.graph_objs as go
-import plotly.express as px
-import pandas as pd
 import numpy as np
 from collections import deque
 from datetime import datetime, timedelta
-import random
 import time
+import threading
 
 # Initialize Dash app
 app = dash.Dash(__name__)
 
+class SensorBuffer:
+    """Ring buffer of the most recent readings, one preallocated array per field"""
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.timestamps = np.empty(size, dtype='datetime64[ms]')
+        self.temperature = np.empty(size, dtype=np.float32)
+        self.pressure = np.empty(size, dtype=np.float32)
+        self.humidity = np.empty(size, dtype=np.float32)
+        self.vibration = np.empty(size, dtype=np.float32)
+        self.anomalies = np.zeros(size, dtype=np.bool_)
+        self.sensor_id = np.empty(size, dtype=np.int16)
+        
+        # Next slot to write, number of filled slots and readings appended so far
+        self.head = 0
+        self.count = 0
+        self.total = 0
+    
+    def __len__(self):
+        return self.count
+    
+    @property
+    def is_full(self) -> bool:
+        return self.count == self.size
+    
+    def append(self, timestamp, temperature, pressure, humidity, vibration, anomaly, sensor_id):
+        """Write a reading over the oldest slot"""
+        i = self.head
+        self.timestamps[i] = timestamp
+        self.temperature[i] = temperature
+        self.pressure[i] = pressure
+        self.humidity[i] = humidity
+        self.vibration[i] = vibration
+        self.anomalies[i] = anomaly
+        self.sensor_id[i] = sensor_id
+        self.head = (i + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.total += 1
+    
+    def window(self, field: str) -> np.ndarray:
+        """Return a field's values in the window, oldest first"""
+        values = getattr(self, field)
+        if self.count < self.size:
+            return values[:self.count]
+        return np.concatenate((values[self.head:], values[:self.head]))
+    
+    def oldest(self, field: str):
+        """Return a field's oldest value, the next one to be overwritten once full"""
+        return getattr(self, field)[self.head if self.is_full else 0]
+    
+    def latest(self, field: str):
+        """Return a field's most recent value"""
+        return getattr(self, field)[self.head - 1]
+
+# Shared generator for all simulated readings
+RNG = np.random.default_rng()
+
+# Normal reading ranges: (temperature, pressure, humidity, vibration)
+READING_LOW = np.array([18, 1003, 45, 0])
+READING_HIGH = np.array([22, 1023, 55, 0.5])
+
+# Offsets applied to anomalous readings
+TEMPERATURE_SPIKES = (-10, 15)
+PRESSURE_SPIKES = (-50, 80)
+ANOMALY_TYPES = ('temperature_spike', 'pressure_drop', 'vibration_high')
+
+def sensor_label(sensor_id):
+    """Format an integer sensor ID for display"""
+    return f"sensor_{sensor_id}"
+
+# The alerts panel lists anomalies among this many most recent readings
+RECENT_ALERTS_WINDOW = 10
+
+# (reading number, alert item) for recent anomalies, newest first
+recent_alerts_buf = deque(maxlen=RECENT_ALERTS_WINDOW)
+
+def record_alert():
+    """Add an alert item for the latest reading"""
+    alert_time = sensor_data.latest('timestamps').item().strftime('%H:%M:%S')
+    alert_text = f"[{alert_time}] {sensor_label(sensor_data.latest('sensor_id'))} - Anomaly detected: Temp={sensor_data.latest('temperature'):.1f}°C"
+    recent_alerts_buf.appendleft((sensor_data.total, html.Div(alert_text, className='alert-item')))
+
+def recent_alert_items():
+    """Return alert items still within the last RECENT_ALERTS_WINDOW readings, newest first"""
+    while recent_alerts_buf and recent_alerts_buf[-1][0] <= sensor_data.total - RECENT_ALERTS_WINDOW:
+        recent_alerts_buf.pop()
+    return [item for _, item in recent_alerts_buf]
+
 # Store recent data
 MAX_DATA_POINTS = 100
-sensor_data = {
-    'temperature': deque(maxlen=MAX_DATA_POINTS),
-    'pressure': deque(maxlen=MAX_DATA_POINTS),
-    'humidity': deque(maxlen=MAX_DATA_POINTS),
-    'vibration': deque(maxlen=MAX_DATA_POINTS),
-    'timestamps': deque(maxlen=MAX_DATA_POINTS),
-    'anomalies': deque(maxlen=MAX_DATA_POINTS),
-    'sensor_id': deque(maxlen=MAX_DATA_POINTS)
-}
-
-# Initialize with some data
-for i in range(50):
-    sensor_data['timestamps'].append(datetime.now() - timedelta(seconds=i*2))
-    sensor_data['temperature'].append(20 + random.uniform(-2, 2))
-    sensor_data['pressure'].append(1013 + random.uniform(-10, 10))
-    sensor_data['humidity'].append(50 + random.uniform(-5, 5))
-    sensor_data['vibration'].append(random.uniform(0, 0.5))
-    sensor_data['anomalies'].append(random.random() > 0.9)  # 10% anomalies
-    sensor_data['sensor_id'].append(f"sensor_{random.randint(1, 10)}")
-
-app.layout = html.Div([
-    html.Div([
-        html.H1("AnomaLens - Real-time Anomaly Dashboard", 
-                style={'textAlign': 'center', 'color': '#2c3e50'}),
-        html.P("Live monitoring of IoT sensor data with anomaly detection",
-               style={'textAlign': 'center', 'color': '#7f8c8d'})
-    ], style={'backgroundColor': '#ecf0f1', 'padding': '20px', 'marginBottom': '20px'}),
+sensor_data = SensorBuffer(MAX_DATA_POINTS)
+
+# Initialize with some data, drawn in one call per field
+n_initial = 50
+initial_readings = RNG.uniform(READING_LOW, READING_HIGH, size=(n_initial, 4)).tolist()
+initial_anomalies = (RNG.random(n_initial) > 0.9).tolist()  # 10% anomalies
+initial_sensors = RNG.integers(1, 11, size=n_initial).tolist()
+now = datetime.now()
+for i in range(n_initial):
+    sensor_data.append(
+        now - timedelta(seconds=i*2),
+        *initial_readings[i],
+        initial_anomalies[i],
+        initial_sensors[i]
+    )
+    if initial_anomalies[i]:
+        record_alert()
+
+# Figure layouts, validated once and kept as plain dicts since titles, axes and colors never change
+TEMPERATURE_LAYOUT = go.Layout(
+    title='🌡️ Temperature Over Time',
+    xaxis_title='Time',
+    yaxis_title='Temperature (°C)',
+    template='plotly_white',
+    height=350
+).to_plotly_json()
+
+PRESSURE_LAYOUT = go.Layout(
+    title='📊 Pressure Over Time',
+    xaxis_title='Time',
+    yaxis_title='Pressure (hPa)',
+    template='plotly_white',
+    height=350
+).to_plotly_json()
+
+HUMIDITY_LAYOUT = go.Layout(
+    title='💧 Humidity Over Time',
+    xaxis_title='Time',
+    yaxis_title='Humidity (%)',
+    template='plotly_white',
+    height=350
+).to_plotly_json()
+
+VIBRATION_LAYOUT = go.Layout(
+    title='📳 Vibration Over Time',
+    xaxis_title='Time',
+    yaxis_title='Vibration Level',
+    template='plotly_white',
+    height=350
+).to_plotly_json()
+
+ANOMALY_DIST_LAYOUT = go.Layout(
+    title='📈 Anomaly Distribution',
+    template='plotly_white',
+    height=350
+).to_plotly_json()
+
+SENSOR_STATUS_LAYOUT = go.Layout(
+    title='📱 Sensor Status',
+    xaxis_title='sensor',
+    yaxis_title='value',
+    legend_title_text='status',
+    barmode='relative',
+    template='plotly_white',
+    height=350
+).to_plotly_json()
+
+STATUS_COLORS = {'✅ Normal': '#2ecc71', '⚠️ Alert': '#e74c3c'}
+
+# Line charts patched on every tick: (sensor_data key, layout, trace name, color)
+LINE_CHARTS = (
+    ('temperature', TEMPERATURE_LAYOUT, 'Temperature', '#3498db'),
+    ('pressure', PRESSURE_LAYOUT, 'Pressure', '#2ecc71'),
+    ('humidity', HUMIDITY_LAYOUT, 'Humidity', '#9b59b6'),
+    ('vibration', VIBRATION_LAYOUT, 'Vibration', '#e74c3c')
+)
+
+# Serializes ticks and page loads, since every browser session shares sensor_data
+sensor_data_lock = threading.Lock()
+
+def anomaly_points():
+    """Return the (timestamps, temperatures) of anomalous points in the window"""
+    anomaly_indices = np.nonzero(sensor_data.window('anomalies'))[0]
+    return (sensor_data.window('timestamps')[anomaly_indices].tolist(),
+            sensor_data.window('temperature')[anomaly_indices].tolist())
+
+def build_line_figure(key, layout, name, color):
+    """Build a time-series figure from the current window"""
+    # Plain lists, since Plotly would encode arrays as binary blobs patches can't append to
+    trace = {
+        'type': 'scatter',
+        'x': sensor_data.window('timestamps').tolist(),
+        'y': sensor_data.window(key).tolist(),
+        'mode': 'lines',
+        'name': name,
+        'line': {'color': color, 'width': 2}
+    }
+    data = [trace]
     
-    html.Div([
-        html.Div([
-            dcc.Graph(id='live-temperature', style={'height': '400px'}),
-            dcc.Graph(id='live-pressure', style={'height': '400px'})
-        ], className='row'),
+    if key == 'temperature':
+        trace['mode'] = 'lines+markers'
+        trace['marker'] = {'size': 6}
         
-        html.Div([
-            dcc.Graph(id='live-humidity', style={'height': '400px'}),
-            dcc.Graph(id='live-vibration', style={'height': '400px'})
-        ], className='row'),
-        
-        html.Div([
-            dcc.Graph(id='anomaly-distribution', style={'height': '400px'}),
-            dcc.Graph(id='sensor-status', style={'height': '400px'})
-        ], className='row')
-    ], style={'padding': '10px'}),
+        # Highlight anomalies (always present so patches can address it as trace 1)
+        anomaly_x, anomaly_y = anomaly_points()
+        data.append({
+            'type': 'scatter',
+            'x': anomaly_x,
+            'y': anomaly_y,
+            'mode': 'markers',
+            'name': 'Anomalies',
+            'marker': {'color': 'red', 'size': 12, 'symbol': 'x'}
+        })
+    return {'data': data, 'layout': layout}
+
+def build_anomaly_dist_figure(normal_count, anomaly_count):
+    """Build the normal/anomaly pie chart"""
+    return {
+        'data': [{
+            'type': 'pie',
+            'labels': ['Normal', 'Anomalies'],
+            'values': [normal_count, anomaly_count],
+            'marker': {'colors': ['#2ecc71', '#e74c3c']}
+        }],
+        'layout': ANOMALY_DIST_LAYOUT
+    }
+
+def compute_sensor_status():
+    """Return (sensor, status, value) for every sensor based on its last 5 readings"""
+    sensor_ids, inverse = np.unique(sensor_data.window('sensor_id'), return_inverse=True)
+    anomalies = sensor_data.window('anomalies')
     
-    html.Div([
-        html.H3("📊 Statistics", style={'marginTop': '30px'}),
-        html.Div(id='stats-container', className='row')
-    ], style={'backgroundColor': '#f8f9fa', 'padding': '20px', 'marginTop': '20px'}),
+    # Rank each reading from the end of its sensor's group to keep only the last 5
+    counts = np.bincount(inverse, minlength=len(sensor_ids))
+    order = np.argsort(inverse, kind='stable')
+    group_end = np.cumsum(counts)
+    from_end = np.empty_like(order)
+    from_end[order] = group_end[inverse[order]] - 1 - np.arange(len(order))
+    recent = from_end < 5
     
-    html.Div([
-        html.H3("🚨 Recent Alerts", style={'marginTop': '20px'}),
-        html.Div(id='alerts-container', style={
-            'maxHeight': '200px',
-            'overflowY': 'scroll',
-            'border': '1px solid #ddd',
-            'padding': '10px',
-            'backgroundColor': '#fff'
+    latest_anomaly = np.bincount(inverse[recent], weights=anomalies[recent], minlength=len(sensor_ids)) > 0
+    return [
+        (sensor, '⚠️ Alert' if alert else '✅ Normal', 0 if alert else 1)
+        for sensor, alert in zip(map(sensor_label, sensor_ids.tolist()), latest_anomaly.tolist())
+    ]
+
+def build_sensor_status_figure(status_data):
+    """Build the sensor status bar chart, one colored trace per status"""
+    traces = {}
+    for sensor, status, value in status_data:
+        trace = traces.setdefault(status, {
+            'type': 'bar',
+            'name': status,
+            'legendgroup': status,
+            'x': [],
+            'y': [],
+            'marker': {'color': STATUS_COLORS[status]}
         })
-    ], style={'padding': '20px'}),
-    
-    dcc.Interval(
-        id='interval-component',
-        interval=2000,  # Update every 2 seconds
-        n_intervals=0
-    ),
+        trace['x'].append(sensor)
+        trace['y'].append(value)
+    return {'data': list(traces.values()), 'layout': SENSOR_STATUS_LAYOUT}
+
+def initial_figures():
+    """Build all six figures from the current window"""
+    line_figs = [build_line_figure(*chart) for chart in LINE_CHARTS]
+    anomaly_count = int(sensor_data.window('anomalies').sum())
+    anomaly_dist_fig = build_anomaly_dist_figure(len(sensor_data) - anomaly_count, anomaly_count)
+    sensor_status_fig = build_sensor_status_figure(compute_sensor_status())
+    return (*line_figs, anomaly_dist_fig, sensor_status_fig)
+
+def current_stats():
+    """Return the values shown on the statistics cards"""
+    return {
+        'n': len(sensor_data),
+        'anom': int(sensor_data.window('anomalies').sum()),
+        'sensors': len(np.unique(sensor_data.window('sensor_id'))),
+        'temp': float(sensor_data.latest('temperature'))
+    }
+
+def serve_layout():
+    """Build the page, with figures filled from the current window on every page load"""
+    with sensor_data_lock:
+        (temp_fig, pressure_fig, humidity_fig, vibration_fig,
+         anomaly_dist_fig, sensor_status_fig) = initial_figures()
+        stats = current_stats()
+        applied_total = sensor_data.total
     
-    dcc.Store(id='data-store')
-], style={'fontFamily': 'Arial, sans-serif'})
+    return html.Div([
+        html.Div([
+            html.H1("AnomaLens - Real-time Anomaly Dashboard",
+                    style={'textAlign': 'center', 'color': '#2c3e50'}),
+            html.P("Live monitoring of IoT sensor data with anomaly detection",
+                   style={'textAlign': 'center', 'color': '#7f8c8d'})
+        ], style={'backgroundColor': '#ecf0f1', 'padding': '20px', 'marginBottom': '20px'}),
+        
+        html.Div([
+            html.Div([
+                dcc.Graph(id='live-temperature', figure=temp_fig, style={'height': '400px'}),
+                dcc.Graph(id='live-pressure', figure=pressure_fig, style={'height': '400px'})
+            ], className='row'),
+            
+            html.Div([
+                dcc.Graph(id='live-humidity', figure=humidity_fig, style={'height': '400px'}),
+                dcc.Graph(id='live-vibration', figure=vibration_fig, style={'height': '400px'})
+            ], className='row'),
+            
+            html.Div([
+                dcc.Graph(id='anomaly-distribution', figure=anomaly_dist_fig, style={'height': '400px'}),
+                dcc.Graph(id='sensor-status', figure=sensor_status_fig, style={'height': '400px'})
+            ], className='row')
+        ], style={'padding': '10px'}),
+        
+        html.Div([
+            html.H3("📊 Statistics", style={'marginTop': '30px'}),
+            # Static cards; the values are filled in the browser from stats-store
+            html.Div(html.Div([
+                html.Div([
+                    html.H4(id='stat-n', style={'color': '#3498db'}),
+                    html.P("Total Data Points")
+                ], className='stat-card'),
+                html.Div([
+                    html.H4(id='stat-anomalies', style={'color': '#e74c3c'}),
+                    html.P("Anomalies Detected")
+                ], className='stat-card'),
+                html.Div([
+                    html.H4(id='stat-sensors', style={'color': '#2ecc71'}),
+                    html.P("Active Sensors")
+                ], className='stat-card'),
+                html.Div([
+                    html.H4(id='stat-temp', style={'color': '#9b59b6'}),
+                    html.P("Current Temp")
+                ], className='stat-card')
+            ], style={'display': 'flex', 'flexWrap': 'wrap', 'justifyContent': 'center'}),
+                id='stats-container', className='row')
+        ], style={'backgroundColor': '#f8f9fa', 'padding': '20px', 'marginTop': '20px'}),
+        
+        html.Div([
+            html.H3("🚨 Recent Alerts", style={'marginTop': '20px'}),
+            html.Div(id='alerts-container', style={
+                'maxHeight': '200px',
+                'overflowY': 'scroll',
+                'border': '1px solid #ddd',
+                'padding': '10px',
+                'backgroundColor': '#fff'
+            })
+        ], style={'padding': '20px'}),
+        
+        dcc.Interval(
+            id='interval-component',
+            interval=2000,  # Update every 2 seconds
+            n_intervals=0
+        ),
+        
+        dcc.Store(id='stats-store', storage_type='memory', data=stats),
+        
+        # Number of readings this page's figures reflect, so ticks know whether a patch applies
+        dcc.Store(id='applied-total', storage_type='memory', data=applied_total)
+    ], style={'fontFamily': 'Arial, sans-serif'})
+
+app.layout = serve_layout
 
 # CSS for responsive design
 app.index_string = '''
@@ -136,19 +413,17 @@ app.index_string = '''
 def generate_new_data_point():
     """Generate new simulated data point"""
     timestamp = datetime.now()
-    temperature = 20 + random.uniform(-2, 2)
-    pressure = 1013 + random.uniform(-10, 10)
-    humidity = 50 + random.uniform(-5, 5)
-    vibration = random.uniform(0, 0.5)
+    temperature, pressure, humidity, vibration = RNG.uniform(READING_LOW, READING_HIGH).tolist()
     
     # Randomly introduce anomalies (5% chance)
-    is_anomaly = random.random() > 0.95
+    is_anomaly = RNG.random() > 0.95
     
     if is_anomaly:
         # Make data point anomalous
-        temperature += random.choice([-10, 15])
-        pressure += random.choice([-50, 80])
-        anomaly_type = random.choice(['temperature_spike', 'pressure_drop', 'vibration_high'])
+        temperature_pick, pressure_pick, type_pick = RNG.integers([2, 2, 3]).tolist()
+        temperature += TEMPERATURE_SPIKES[temperature_pick]
+        pressure += PRESSURE_SPIKES[pressure_pick]
+        anomaly_type = ANOMALY_TYPES[type_pick]
     else:
         anomaly_type = 'normal'
     
@@ -160,7 +435,7 @@ def generate_new_data_point():
         'vibration': vibration,
         'anomaly': is_anomaly,
         'anomaly_type': anomaly_type,
-        'sensor_id': f"sensor_{random.randint(1, 10)}"
+        'sensor_id': int(RNG.integers(1, 11))
     }
 
 @app.callback(
@@ -170,184 +445,101 @@ def generate_new_data_point():
      Output('live-vibration', 'figure'),
      Output('anomaly-distribution', 'figure'),
      Output('sensor-status', 'figure'),
-     Output('stats-container', 'children'),
+     Output('stats-store', 'data'),
      Output('alerts-container', 'children'),
-     Output('data-store', 'data')],
+     Output('applied-total', 'data')],
     Input('interval-component', 'n_intervals'),
-    State('data-store', 'data')
+    State('applied-total', 'data')
 )
-def update_all_graphs(n, stored_data):
-    # Generate new data point
-    new_data = generate_new_data_point()
-    
-    # Update sensor data
-    sensor_data['timestamps'].append(new_data['timestamp'])
-    sensor_data['temperature'].append(new_data['temperature'])
-    sensor_data['pressure'].append(new_data['pressure'])
-    sensor_data['humidity'].append(new_data['humidity'])
-    sensor_data['vibration'].append(new_data['vibration'])
-    sensor_data['anomalies'].append(new_data['anomaly'])
-    sensor_data['sensor_id'].append(new_data['sensor_id'])
-    
-    # Create temperature plot
-    temp_fig = go.Figure()
-    temp_fig.add_trace(go.Scatter(
-        x=list(sensor_data['timestamps']),
-        y=list(sensor_data['temperature']),
-        mode='lines+markers',
-        name='Temperature',
-        line=dict(color='#3498db', width=2),
-        marker=dict(size=6)
-    ))
-    
-    # Highlight anomalies
-    anomaly_indices = [i for i, anomaly in enumerate(sensor_data['anomalies']) if anomaly]
-    if anomaly_indices:
-        temp_fig.add_trace(go.Scatter(
-            x=[sensor_data['timestamps'][i] for i in anomaly_indices],
-            y=[sensor_data['temperature'][i] for i in anomaly_indices],
-            mode='markers',
-            name='Anomalies',
-            marker=dict(color='red', size=12, symbol='x')
-        ))
-    
-    temp_fig.update_layout(
-        title='🌡️ Temperature Over Time',
-        xaxis_title='Time',
-        yaxis_title='Temperature (°C)',
-        template='plotly_white',
-        height=350
-    )
-    
-    # Create pressure plot
-    pressure_fig = go.Figure()
-    pressure_fig.add_trace(go.Scatter(
-        x=list(sensor_data['timestamps']),
-        y=list(sensor_data['pressure']),
-        mode='lines',
-        name='Pressure',
-        line=dict(color='#2ecc71', width=2)
-    ))
-    pressure_fig.update_layout(
-        title='📊 Pressure Over Time',
-        xaxis_title='Time',
-        yaxis_title='Pressure (hPa)',
-        template='plotly_white',
-        height=350
-    )
-    
-    # Create humidity plot
-    humidity_fig = go.Figure()
-    humidity_fig.add_trace(go.Scatter(
-        x=list(sensor_data['timestamps']),
-        y=list(sensor_data['humidity']),
-        mode='lines',
-        name='Humidity',
-        line=dict(color='#9b59b6', width=2)
-    ))
-    humidity_fig.update_layout(
-        title='💧 Humidity Over Time',
-        xaxis_title='Time',
-        yaxis_title='Humidity (%)',
-        template='plotly_white',
-        height=350
-    )
-    
-    # Create vibration plot
-    vibration_fig = go.Figure()
-    vibration_fig.add_trace(go.Scatter(
-        x=list(sensor_data['timestamps']),
-        y=list(sensor_data['vibration']),
-        mode='lines',
-        name='Vibration',
-        line=dict(color='#e74c3c', width=2)
-    ))
-    vibration_fig.update_layout(
-        title='📳 Vibration Over Time',
-        xaxis_title='Time',
-        yaxis_title='Vibration Level',
-        template='plotly_white',
-        height=350
-    )
-    
-    # Anomaly distribution pie chart
-    anomaly_count = sum(sensor_data['anomalies'])
-    normal_count = len(sensor_data['anomalies']) - anomaly_count
-    anomaly_dist_fig = go.Figure(data=[go.Pie(
-        labels=['Normal', 'Anomalies'],
-        values=[normal_count, anomaly_count],
-        marker_colors=['#2ecc71', '#e74c3c']
-    )])
-    anomaly_dist_fig.update_layout(
-        title='📈 Anomaly Distribution',
-        template='plotly_white',
-        height=350
-    )
+def update_all_graphs(n, applied_total):
+    with sensor_data_lock:
+        # Patches only apply if this page already shows every reading but the one added now;
+        # otherwise (another session ticked, or a response was lost) resend full figures
+        in_sync = applied_total == sensor_data.total
+        
+        # Once the window is full, appending evicts the oldest point
+        evicting = sensor_data.is_full
+        evicted_anomaly = evicting and bool(sensor_data.oldest('anomalies'))
+        previous_status = compute_sensor_status() if in_sync else None
+        
+        # Generate new data point
+        new_data = generate_new_data_point()
+        
+        # Update sensor data
+        sensor_data.append(
+            new_data['timestamp'],
+            new_data['temperature'],
+            new_data['pressure'],
+            new_data['humidity'],
+            new_data['vibration'],
+            new_data['anomaly'],
+            new_data['sensor_id']
+        )
+        
+        if in_sync:
+            figures = patch_figures(new_data['anomaly'], evicting, evicted_anomaly, previous_status)
+        else:
+            figures = initial_figures()
+        
+        # Statistics cards, rendered client-side from these values
+        stats = current_stats()
+        
+        # Recent alerts
+        if new_data['anomaly']:
+            record_alert()
+        recent_alerts = recent_alert_items()
+        
+        if not recent_alerts:
+            recent_alerts = [html.Div("No recent alerts", style={'color': '#7f8c8d'})]
+        
+        return (*figures, stats, recent_alerts, sensor_data.total)
+
+def patch_figures(is_anomaly, evicting, evicted_anomaly, previous_status):
+    """Return updates taking the six figures from the previous reading to the latest one"""
+    # Line charts: send only the new point (and drop the evicted one) instead of the whole figure
+    line_patches = []
+    for key, _, _, _ in LINE_CHARTS:
+        patch = Patch()
+        if evicting:
+            del patch['data'][0]['x'][0]
+            del patch['data'][0]['y'][0]
+        patch['data'][0]['x'].append(sensor_data.latest('timestamps').item())
+        patch['data'][0]['y'].append(sensor_data.latest(key).item())
+        line_patches.append(patch)
+    temp_patch = line_patches[0]
     
-    # Sensor status heatmap
-    sensor_ids = list(set(sensor_data['sensor_id']))
-    status_data = []
-    for sensor in sensor_ids:
-        indices = [i for i, sid in enumerate(sensor_data['sensor_id']) if sid == sensor]
-        if indices:
-            latest_anomaly = any(sensor_data['anomalies'][i] for i in indices[-5:])
-            status_data.append({
-                'sensor': sensor,
-                'status': '⚠️ Alert' if latest_anomaly else '✅ Normal',
-                'value': 0 if latest_anomaly else 1
-            })
+    # Anomaly markers only move when an anomalous point enters or leaves the window
+    if is_anomaly or evicted_anomaly:
+        anomaly_x, anomaly_y = anomaly_points()
+        temp_patch['data'][1]['x'] = anomaly_x
+        temp_patch['data'][1]['y'] = anomaly_y
     
-    if status_data:
-        df_status = pd.DataFrame(status_data)
-        sensor_status_fig = px.bar(df_status, x='sensor', y='value', 
-                                 color='status', title='📱 Sensor Status',
-                                 color_discrete_map={'✅ Normal': '#2ecc71', '⚠️ Alert': '#e74c3c'})
+    # Anomaly distribution pie chart, unchanged when the new point replaces a like one
+    if evicting and is_anomaly == evicted_anomaly:
+        anomaly_dist_update = no_update
     else:
-        sensor_status_fig = go.Figure()
-        sensor_status_fig.update_layout(title='📱 Sensor Status')
-    sensor_status_fig.update_layout(template='plotly_white', height=350)
+        anomaly_count = int(sensor_data.window('anomalies').sum())
+        anomaly_dist_update = Patch()
+        anomaly_dist_update['data'][0]['values'] = [len(sensor_data) - anomaly_count, anomaly_count]
     
-    # Statistics cards
-    stats = html.Div([
-        html.Div([
-            html.H4(f"{len(sensor_data['timestamps'])}", style={'color': '#3498db'}),
-            html.P("Total Data Points")
-        ], className='stat-card'),
-        html.Div([
-            html.H4(f"{anomaly_count}", style={'color': '#e74c3c'}),
-            html.P("Anomalies Detected")
-        ], className='stat-card'),
-        html.Div([
-            html.H4(f"{len(set(sensor_data['sensor_id']))}", style={'color': '#2ecc71'}),
-            html.P("Active Sensors")
-        ], className='stat-card'),
-        html.Div([
-            html.H4(f"{sensor_data['temperature'][-1]:.1f}°C", style={'color': '#9b59b6'}),
-            html.P("Current Temp")
-        ], className='stat-card')
-    ], style={'display': 'flex', 'flexWrap': 'wrap', 'justifyContent': 'center'})
-    
-    # Recent alerts
-    recent_alerts = []
-    for i in range(min(10, len(sensor_data['timestamps']))):
-        idx = -i-1
-        if sensor_data['anomalies'][idx]:
-            alert_time = sensor_data['timestamps'][idx].strftime('%H:%M:%S')
-            alert_text = f"[{alert_time}] {sensor_data['sensor_id'][idx]} - Anomaly detected: Temp={sensor_data['temperature'][idx]:.1f}°C"
-            recent_alerts.append(html.Div(alert_text, className='alert-item'))
-    
-    if not recent_alerts:
-        recent_alerts = [html.Div("No recent alerts", style={'color': '#7f8c8d'})]
-    
-    # Store data for next callback
-    stored_data = {
-        'timestamps': list(sensor_data['timestamps']),
-        'temperatures': list(sensor_data['temperature']),
-        'anomalies': list(sensor_data['anomalies'])
-    }
+    # Sensor status bar chart, rebuilt only when some sensor's status changed
+    status_data = compute_sensor_status()
+    if status_data == previous_status:
+        sensor_status_fig = no_update
+    else:
+        sensor_status_fig = build_sensor_status_figure(status_data)
     
-    return (temp_fig, pressure_fig, humidity_fig, vibration_fig, 
-            anomaly_dist_fig, sensor_status_fig, stats, recent_alerts, stored_data)
+    return (*line_patches, anomaly_dist_update, sensor_status_fig)
+
+# Fill the statistics cards in the browser (assets/stats.js)
+app.clientside_callback(
+    ClientsideFunction(namespace='stats', function_name='update'),
+    [Output('stat-n', 'children'),
+     Output('stat-anomalies', 'children'),
+     Output('stat-sensors', 'children'),
+     Output('stat-temp', 'children')],
+    Input('stats-store', 'data')
+)
 
 # Add custom CSS
 app.css.append_css({
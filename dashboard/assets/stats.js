@@ -0,0 +1,16 @@
+// Render the statistics cards from the stats-store values
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    stats: {
+        update: function(data) {
+            if (!data) {
+                return Array(4).fill(window.dash_clientside.no_update);
+            }
+            return [
+                String(data.n),
+                String(data.anom),
+                String(data.sensors),
+                data.temp.toFixed(1) + '°C'
+            ];
+        }
+    }
+});
@@ -1,8 +1,16 @@
 import mlflow
 import mlflow.sklearn
 from datetime import datetime
+import numpy as np
 import pandas as pd
 import joblib
+from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
+
+# Also render the confusion matrix as a Matplotlib figure (slow to import and draw)
+LOG_CONFUSION_MATRIX_PLOT = False
+
+if LOG_CONFUSION_MATRIX_PLOT:
+    import matplotlib.pyplot as plt
 
 class ExperimentTracker:
     def __init__(self, experiment_name="AnomaLens_Experiments"):
@@ -10,7 +18,7 @@ class ExperimentTracker:
         
     def log_experiment(self, model, params, metrics, X_test, y_test, model_name="isolation_forest"):
         """Log experiment to MLflow"""
-        with mlflow.start_run():
+        with mlflow.start_run() as run:
             # Log parameters
             mlflow.log_params(params)
             
@@ -20,18 +28,23 @@ class ExperimentTracker:
             # Log model
             mlflow.sklearn.log_model(model, model_name)
             
-            # Log test data sample
-            test_sample = pd.DataFrame(X_test[:100])
-            test_sample.to_csv("test_sample.csv", index=False)
-            mlflow.log_artifact("test_sample.csv")
+            # Log test data sample straight from the arrays, without a CSV on disk
+            test_sample = np.asarray(X_test[:100])
+            mlflow.log_table(
+                {str(i): test_sample[:, i] for i in range(test_sample.shape[1])},
+                "test_sample.json"
+            )
             
-            # Log confusion matrix plot
-            import matplotlib.pyplot as plt
-            from sklearn.metrics import ConfusionMatrixDisplay
+            # Log confusion matrix from a single predict pass
+            y_pred = model.predict(X_test)
+            labels = np.union1d(y_test, y_pred)
+            cm = confusion_matrix(y_test, y_pred, labels=labels)
+            mlflow.log_dict({'labels': labels.tolist(), 'cm': cm.tolist()}, "confusion_matrix.json")
             
-            fig, ax = plt.subplots(figsize=(8, 6))
-            ConfusionMatrixDisplay.from_predictions(y_test, model.predict(X_test), ax=ax)
-            plt.savefig("confusion_matrix.png")
-            mlflow.log_artifact("confusion_matrix.png")
-            
-        print(f"✅ Experiment logged to MLflow: {mlflow.active_run().info.run_id}")
\ No newline at end of file
+            if LOG_CONFUSION_MATRIX_PLOT:
+                fig, ax = plt.subplots(figsize=(8, 6))
+                ConfusionMatrixDisplay(cm, display_labels=labels).plot(ax=ax)
+                mlflow.log_figure(fig, "confusion_matrix.png")
+                plt.close(fig)
+        
+        print(f"✅ Experiment logged to MLflow: {run.info.run_id}")
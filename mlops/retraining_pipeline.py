@@ -1,9 +1,10 @@
-import schedule
-import time
+from apscheduler.schedulers.blocking import BlockingScheduler
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import joblib
 from sklearn.ensemble import IsolationForest
+from core.config import settings
 
 class AutoRetrainingPipeline:
     def __init__(self, model_path="models/latest_model.joblib"):
@@ -33,9 +34,17 @@ class AutoRetrainingPipeline:
             # 2. Preprocess
             # Your preprocessing code
             
+            # Contiguous float32 halves the bytes the tree builder streams through
+            X_train = np.ascontiguousarray(new_data[list(settings.FEATURE_COLUMNS)].to_numpy(dtype=np.float32))
+            
             # 3. Train new model
-            self.model = IsolationForest(contamination=0.1, random_state=42)
-            # self.model.fit(X_train)
+            self.model = IsolationForest(
+                contamination=0.1,
+                random_state=42,
+                max_samples=min(256, len(X_train)),
+                n_jobs=-1
+            )
+            self.model.fit(X_train)
             
             # 4. Save model
             joblib.dump(self.model, self.model_path)
@@ -53,10 +62,12 @@ class AutoRetrainingPipeline:
         
     def start_scheduler(self):
         """Start scheduled retraining"""
-        # Retrain daily at 2 AM
-        schedule.every().day.at("02:00").do(self.retrain_model)
+        # Retrain daily at 2 AM; the scheduler sleeps until the next fire time
+        scheduler = BlockingScheduler()
+        scheduler.add_job(self.retrain_model, 'cron', hour=2, minute=0)
         
         print("🔄 Auto-retraining scheduler started")
-        while True:
-            schedule.run_pending()
-            time.sleep(60)
\ No newline at end of file
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            scheduler.shutdown(wait=False)
\ No newline at end of file
@@ -11,6 +11,9 @@ class RealTimeProcessor:
                    "org.apache.spark:spark-sql-kafka-0-10_2.12:3.3.0") \
             .getOrCreate()
         
+        # Built once and reused by every stream
+        self.schema = self.create_schema()
+        
     def create_schema(self):
         return StructType([
             StructField("sensor_id", StringType()),
@@ -28,8 +31,10 @@ class RealTimeProcessor:
             .format("kafka") \
             .option("kafka.bootstrap.servers", "localhost:9092") \
             .option("subscribe", topic) \
+            .option("minPartitions", self.spark.sparkContext.defaultParallelism * 2) \
+            .option("maxOffsetsPerTrigger", 50000) \
             .load()
         
-        return df.select(
-            from_json(col("value").cast("string"), self.create_schema()).alias("data")
-        ).select("data.*")
\ No newline at end of file
+        return df.selectExpr("CAST(value AS STRING) AS json") \
+            .select(from_json(col("json"), self.schema).alias("data")) \
+            .select("data.*")
\ No newline at end of file
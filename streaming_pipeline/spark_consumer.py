@@ -1,8 +1,19 @@
 from pyspark.sql import SparkSession
 from pyspark.sql.functions import *
 from pyspark.sql.types import *
+from functools import reduce
+import operator
 import json
 
+# Where scored micro-batches and the stream's checkpoint are written
+STREAM_OUTPUT_PATH = "/data/anomalens"
+STREAM_CHECKPOINT_PATH = "/data/anomalens_checkpoint"
+
+# Threshold rules flagging a reading as anomalous: (column, comparison, threshold)
+ANOMALY_THRESHOLDS = (
+    ("temperature", operator.gt, 35),
+)
+
 class SparkStreamProcessor:
     def __init__(self):
         self.spark = SparkSession.builder \
@@ -20,7 +31,15 @@ class SparkStreamProcessor:
             StructField("status", StringType())
         ])
     
-    def start_streaming(self):
+    def write_batch(self, batch_df, epoch_id):
+        """Append one micro-batch to Parquet as a few zstd-compressed files"""
+        batch_df.coalesce(4) \
+            .write \
+            .mode("append") \
+            .option("compression", "zstd") \
+            .parquet(f"{STREAM_OUTPUT_PATH}/epoch={epoch_id}")
+    
+    def start_streaming(self, debug=False):
         # Read from Kafka
         df = self.spark \
             .readStream \
@@ -34,18 +53,28 @@ class SparkStreamProcessor:
             from_json(col("value").cast("string"), self.schema).alias("data")
         ).select("data.*")
         
-        # Apply anomaly detection (simple threshold-based)
+        # Apply anomaly detection (simple threshold-based), OR-ing every rule
+        # into one Catalyst expression so it stays in generated JVM code
+        is_anomaly = reduce(
+            operator.or_,
+            (compare(col(column), threshold) for column, compare, threshold in ANOMALY_THRESHOLDS)
+        )
         processed_df = parsed_df.withColumn(
             "is_anomaly",
-            when(col("temperature") > 35, 1).otherwise(0)
+            when(is_anomaly, 1).otherwise(0)
         )
         
-        # Write to console (or database/file)
-        query = processed_df \
+        # Write to Parquet in columnar, compressed batches (noop sink when debugging)
+        writer = processed_df \
             .writeStream \
             .outputMode("append") \
-            .format("console") \
-            .option("truncate", "false") \
-            .start()
+            .trigger(processingTime="5 seconds")
+        if debug:
+            writer = writer.format("noop")
+        else:
+            writer = writer \
+                .foreachBatch(self.write_batch) \
+                .option("checkpointLocation", STREAM_CHECKPOINT_PATH)
+        query = writer.start()
         
         query.awaitTermination()
\ No newline at end of file
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import smtplib
+import subprocess
+import pytest
+from alerts import smtp_pool
+from alerts.smtp_pool import PooledSMTP
+
+EMAIL_CONFIG = {
+    'smtp_server': 'smtp.test.com',
+    'smtp_port': 587,
+    'username': 'test',
+    'password': 'test',
+    'max_messages_per_connection': 3
+}
+
+class FakeSMTP:
+    """In-memory stand-in for smtplib.SMTP that records every session it opens"""
+    sessions = []
+    refuse = set()
+    fail_login = False
+    
+    def __init__(self, host, port):
+        self.sent = []
+        self.noop_code = 250
+        self.closed = False
+        FakeSMTP.sessions.append(self)
+    
+    def starttls(self):
+        pass
+    
+    def login(self, username, password):
+        if self.fail_login:
+            raise smtplib.SMTPAuthenticationError(535, b'bad credentials')
+    
+    def noop(self):
+        if self.noop_code is None:
+            raise smtplib.SMTPServerDisconnected()
+        return (self.noop_code, b'ok')
+    
+    def sendmail(self, sender, recipients, payload):
+        if recipients[0] in self.refuse:
+            raise smtplib.SMTPRecipientsRefused({recipients[0]: (550, b'no such user')})
+        self.sent.append(recipients[0])
+    
+    def send_message(self, msg):
+        self.sent.append(msg)
+    
+    def quit(self):
+        self.closed = True
+    
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    """Route PooledSMTP connections to FakeSMTP"""
+    FakeSMTP.sessions = []
+    FakeSMTP.refuse = set()
+    FakeSMTP.fail_login = False
+    monkeypatch.setattr(smtp_pool.smtplib, 'SMTP', FakeSMTP)
+    return FakeSMTP
+
+class TestPooledSMTP:
+    
+    def test_session_reused_between_messages(self, fake_smtp):
+        """Test consecutive messages share one session"""
+        pool = PooledSMTP(EMAIL_CONFIG)
+        pool.sendmail('a@test.com', ['b@test.com'], 'payload')
+        pool.send_message('msg')
+        
+        assert len(fake_smtp.sessions) == 1
+        assert fake_smtp.sessions[0].sent == ['b@test.com', 'msg']
+    
+    def test_recycles_after_max_messages(self, fake_smtp):
+        """Test the session is replaced once max_messages_per_connection is reached"""
+        pool = PooledSMTP(EMAIL_CONFIG)
+        pool.sendmail('a@test.com', ['b@test.com', 'c@test.com', 'd@test.com'], 'payload')
+        pool.send_message('msg')
+        
+        first, second = fake_smtp.sessions
+        assert first.sent == ['b@test.com', 'c@test.com', 'd@test.com']
+        assert first.closed
+        assert second.sent == ['msg']
+    
+    def test_reconnects_after_failed_noop(self, fake_smtp):
+        """Test a session that fails its health check is replaced"""
+        pool = PooledSMTP(EMAIL_CONFIG)
+        pool.send_message('first')
+        fake_smtp.sessions[0].noop_code = None
+        pool.send_message('second')
+        
+        assert len(fake_smtp.sessions) == 2
+        assert fake_smtp.sessions[1].sent == ['second']
+    
+    def test_failed_login_closes_socket(self, fake_smtp):
+        """Test a connection whose login fails is closed rather than leaked"""
+        fake_smtp.fail_login = True
+        pool = PooledSMTP(EMAIL_CONFIG)
+        
+        with pytest.raises(smtplib.SMTPAuthenticationError):
+            pool.send_message('msg')
+        assert fake_smtp.sessions[0].closed
+    
+    def test_refused_recipient_does_not_stop_others(self, fake_smtp):
+        """Test remaining recipients are still sent to and the refusals are reported"""
+        fake_smtp.refuse = {'b@test.com'}
+        pool = PooledSMTP(dict(EMAIL_CONFIG, max_messages_per_connection=100))
+        
+        with pytest.raises(smtplib.SMTPRecipientsRefused) as exc:
+            pool.sendmail('a@test.com', ['b@test.com', 'c@test.com'], 'payload')
+        assert list(exc.value.recipients) == ['b@test.com']
+        assert fake_smtp.sessions[0].sent == ['c@test.com']
+
+def make_alert_manager(batch_duration_seconds=0.2):
+    """AlertManager whose only channel records the batches it is given"""
+    from alerts.alert_manager import AlertManager
+    
+    manager = AlertManager()
+    manager.config['batching']['batch_duration_seconds'] = batch_duration_seconds
+    manager.batches = []
+    manager._channels = [manager.batches.append]
+    return manager
+
+class TestAlertBatching:
+    
+    def test_alerts_within_window_sent_as_one_batch(self):
+        """Test alerts queued inside the batch window are delivered together"""
+        manager = make_alert_manager()
+        for i in range(3):
+            manager.send_alert({'sensor_id': f'sensor_{i:03d}'})
+        
+        time.sleep(0.5)
+        assert [len(batch) for batch in manager.batches] == [3]
+        manager.close()
+    
+    def test_close_delivers_alert_held_by_flusher(self):
+        """Test an alert sent just before close() is delivered, not lost with the open batch"""
+        manager = make_alert_manager(batch_duration_seconds=30)
+        alert_id = manager.send_alert({'sensor_id': 'sensor_001'})
+        
+        manager.close()
+        assert [[alert['alert_id'] for alert in batch] for batch in manager.batches] == [[alert_id]]
+        assert not manager._flusher.is_alive()
+    
+    def test_alert_delivered_when_process_exits(self):
+        """Test exiting right after send_alert still delivers the alert"""
+        script = (
+            "import time\n"
+            "from alerts.alert_manager import AlertManager\n"
+            "manager = AlertManager()\n"
+            "manager._channels = [lambda alerts: print('sent', len(alerts), flush=True)]\n"
+            "manager.send_alert({'sensor_id': 'sensor_001'})\n"
+            # Give the flusher time to take the alert into its open batch
+            "time.sleep(0.2)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, timeout=30
+        )
+        assert result.stdout.strip() == 'sent 1'
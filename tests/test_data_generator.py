@@ -0,0 +1,53 @@
+import os
+import numpy as np
+import pytest
+from core import data_generator
+from core.data_generator import load_training_data, generate_training_data
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Empty training-data cache directory with the in-process memo cleared"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(data_generator.settings.TRAINING_DATA_CACHE_DIR, exist_ok=True)
+    load_training_data.cache_clear()
+    yield tmp_path / data_generator.settings.TRAINING_DATA_CACHE_DIR
+    load_training_data.cache_clear()
+
+def fail_to_generate(*args, **kwargs):
+    """Stand-in generator for loads that must come from disk"""
+    raise AssertionError("expected a disk cache hit")
+
+class TestTrainingDataCache:
+    
+    def test_miss_writes_cache_then_hits(self, cache_dir, monkeypatch):
+        """Test the first load generates and stores the data and a later load reads it back"""
+        X, y = load_training_data(n_samples=200, seed=7)
+        assert [p.name for p in cache_dir.iterdir()] == [
+            f"train_v{data_generator.GENERATOR_VERSION}_200_0.1_s7.npz"
+        ]
+        
+        load_training_data.cache_clear()
+        monkeypatch.setattr(data_generator, 'generate_training_data', fail_to_generate)
+        X_cached, y_cached = load_training_data(n_samples=200, seed=7)
+        np.testing.assert_array_equal(X_cached, X)
+        np.testing.assert_array_equal(y_cached, y)
+        assert not X_cached.flags.writeable
+    
+    def test_seed_is_part_of_key(self, cache_dir):
+        """Test a different seed misses the cache and gets its own data"""
+        X_a, _ = load_training_data(n_samples=200, seed=1)
+        X_b, _ = load_training_data(n_samples=200, seed=2)
+        
+        assert len(list(cache_dir.iterdir())) == 2
+        assert not np.array_equal(X_a, X_b)
+        np.testing.assert_array_equal(X_b, generate_training_data(n_samples=200, seed=2)[0])
+    
+    def test_generator_version_is_part_of_key(self, cache_dir, monkeypatch):
+        """Test bumping GENERATOR_VERSION ignores data cached by the previous generator"""
+        load_training_data(n_samples=200)
+        
+        load_training_data.cache_clear()
+        monkeypatch.setattr(data_generator, 'GENERATOR_VERSION', data_generator.GENERATOR_VERSION + 1)
+        load_training_data(n_samples=200)
+        
+        assert len(list(cache_dir.iterdir())) == 2
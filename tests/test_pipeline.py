@@ -4,6 +4,12 @@ import numpy as np
 from anomaly_detection.models import IsolationForestDetector
 from data_generator.generator import IoTDataGenerator
 
+@pytest.fixture(scope="session")
+def iot_dataset():
+    """Generate the shared test dataset once per test session"""
+    generator = IoTDataGenerator()
+    return generator.generate_dataset(n_samples=100)
+
 class TestAnomalyDetection:
     
     def test_data_generation(self):
@@ -17,16 +23,12 @@ class TestAnomalyDetection:
         assert 'humidity' in data
         assert 'vibration' in data
     
-    def test_model_training(self):
+    def test_model_training(self, iot_dataset):
         """Test model can be trained"""
-        # Generate test data
-        generator = IoTDataGenerator()
-        df = generator.generate_dataset(n_samples=100)
-        
         # Initialize and train model
         model = IsolationForestDetector()
         features = ['temperature', 'pressure', 'humidity', 'vibration']
-        X = df[features].values
+        X = np.ascontiguousarray(iot_dataset[features].to_numpy(copy=False))
         
         model.fit(X)
         
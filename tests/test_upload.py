@@ -0,0 +1,56 @@
+import io
+import pytest
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api.endpoints import router, CSV_CHUNK_SIZE
+from core.anomaly_detector import detector
+from core.data_generator import generate_training_data
+
+@pytest.fixture(scope="module")
+def client():
+    """API client backed by a freshly trained detector"""
+    X, _ = generate_training_data(n_samples=1000)
+    detector.train(X)
+    
+    app = FastAPI()
+    app.state.prediction_executor = ThreadPoolExecutor(max_workers=2)
+    app.include_router(router, prefix="/api/v1")
+    with TestClient(app) as test_client:
+        yield test_client
+    app.state.prediction_executor.shutdown()
+
+def upload(client, csv_text):
+    """Post CSV text to the upload endpoint"""
+    return client.post(
+        "/api/v1/predict/upload",
+        files={"file": ("readings.csv", csv_text.encode(), "text/csv")}
+    )
+
+class TestUpload:
+    
+    def test_multi_chunk_upload_returns_every_row(self, client):
+        """Test an upload spanning several parse chunks streams back one prediction per row"""
+        n_rows = 2 * CSV_CHUNK_SIZE + 500
+        rows = "\n".join(f"sensor_{i:04d},{20 + i % 5},1013,50,0.1" for i in range(n_rows))
+        response = upload(client, "sensor_id,temperature,pressure,humidity,vibration\n" + rows)
+        
+        assert response.status_code == 200
+        predictions = pd.read_csv(io.StringIO(response.text), dtype={'sensor_id': str})
+        assert len(predictions) == n_rows
+        assert predictions['sensor_id'].tolist() == [f"sensor_{i:04d}" for i in range(n_rows)]
+        assert {'is_anomaly', 'anomaly_score', 'confidence', 'severity'} <= set(predictions.columns)
+    
+    def test_missing_column_returns_400(self, client):
+        """Test an upload without every required column is rejected before streaming starts"""
+        response = upload(client, "sensor_id,temperature\nsensor_001,22.5\n")
+        
+        assert response.status_code == 400
+        assert "Missing required columns" in response.json()['detail']
+    
+    def test_header_only_upload_returns_400(self, client):
+        """Test an upload with no readings is rejected"""
+        response = upload(client, "sensor_id,temperature,pressure,humidity,vibration\n")
+        
+        assert response.status_code == 400